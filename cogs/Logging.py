@@ -3,6 +3,8 @@ import discord
 from discord.ext import commands
 from discord import Embed
 from utils.config_manager import ConfigManager
+from utils.log_batcher import LogBatcher
+from utils.webhook_sink import WebhookSink
 from datetime import datetime
 
 
@@ -13,8 +15,46 @@ class Logging(commands.Cog):
         self.config = self.config_manager.load_config()  # Load the full config
         self.logging_config = self.config.get('logging', {})  # Get only the logging section
 
+        # Log embeds are buffered per channel and sent up to 10 per message, so
+        # bursts (purges, raids, role sweeps) don't hit the channel rate limit
+        self.batcher = LogBatcher(
+            self._deliver,
+            interval=self.logging_config.get('batch_interval', 2),
+            max_pending=self.logging_config.get('batch_max_pending', 500)
+        )
+
+        # With the webhook transport, logs are posted through per-channel webhooks
+        # and don't share the bot's rate limit with commands and moderation
+        self.webhooks = None
+        if self.logging_config.get('transport', 'bot') == 'webhook':
+            self.webhooks = WebhookSink(
+                bot,
+                cache_path=self.logging_config.get('webhook_cache', 'data/log_webhooks.json'),
+                name=self.logging_config.get('webhook_name', 'Logs'),
+                pool_size=self.logging_config.get('webhook_pool_size', 10)
+            )
+
+    async def cog_load(self):
+        if self.webhooks:
+            await self.webhooks.start()
+        self.batcher.start()
+
+    async def cog_unload(self):
+        await self.batcher.stop()
+        if self.webhooks:
+            await self.webhooks.close()
+
+    async def _deliver(self, channel_id, embeds):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            print(f"Error: Channel ID {channel_id} not found!")
+            return
+        if self.webhooks and await self.webhooks.send(channel, embeds):
+            return
+        await channel.send(embeds=embeds)
+
     async def send_log(self, channel_id, title, description, color, footer=None):
-        """Send log embed to specified channel."""
+        """Queue a log embed for the specified channel."""
         print(f"Sending log to channel ID: {channel_id}")
         channel = self.bot.get_channel(int(channel_id))
         if channel is None:
@@ -33,7 +73,7 @@ class Logging(commands.Cog):
         else:
             description = f"{description}\n\n**Channel:** <#{channel.id}>"
         
-        await channel.send(embed=embed)
+        self.batcher.add(channel.id, embed)
 
     # Message Delete
     async def message_delete(self, message):
@@ -117,6 +117,8 @@ class Analytics(commands.Cog):
     async def process_status_change(self, before, after):
         if not self.config.get('enabled', True) or before.guild is None:
             return
+        if not self.config.get('track_presence', True):
+            return
 
         guild_id = str(before.guild.id)
         user_id = str(before.id)
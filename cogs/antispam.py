@@ -0,0 +1,112 @@
+import asyncio
+import time
+import discord
+from discord.ext import commands
+from utils.config_manager import ConfigManager
+from utils.spam_detector import SpamDetector
+
+REASON_TEXT = {
+    'message_rate': "sending messages too quickly",
+    'duplicates': "repeating the same message",
+    'mentions': "mass mentioning",
+}
+
+class AntiSpam(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.config_manager = ConfigManager('config.json')
+        self.config = self.config_manager.load_config().get('antispam', {})
+        self.enabled = self.config.get('enabled', True)
+
+        self.detector = SpamDetector(
+            limits={name: self.config[name] for name in ('message_rate', 'duplicates', 'mentions', 'join_rate') if name in self.config},
+            max_users=self.config.get('max_tracked_users', 5000)
+        )
+        self.exempt_roles = {str(r) for r in self.config.get('exempt_roles', [])}
+        self._raid_until = {}  # guild_id -> monotonic time before which another raid response is skipped
+        self._tasks = set()
+
+    def cog_unload(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def _spawn(self, coro):
+        # Detection is inline on the gateway path; responses run in the background
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _exempt(self, member):
+        if not isinstance(member, discord.Member):
+            return True
+        if member.guild_permissions.manage_messages:
+            return True
+        return any(str(r.id) in self.exempt_roles for r in member.roles)
+
+    def check_message(self, message):
+        """Called by Listeners for every guild message. Constant time; never awaits."""
+        if not self.enabled or message.guild is None or self._exempt(message.author):
+            return
+        reason = self.detector.check_message(
+            message.guild.id,
+            message.author.id,
+            message.content,
+            len(message.raw_mentions) + len(message.raw_role_mentions) + (1 if message.mention_everyone else 0),
+            time.monotonic()
+        )
+        if reason:
+            self._spawn(self._handle_spam(message, reason))
+
+    def check_join(self, member):
+        """Called by Listeners for every member join."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if self.detector.check_join(member.guild.id, now) and now >= self._raid_until.get(member.guild.id, 0):
+            self._raid_until[member.guild.id] = now + self.config.get('raid_cooldown', 600)
+            self._spawn(self._handle_raid(member.guild))
+
+    async def _handle_spam(self, message, reason):
+        member = message.author
+        action = self.config.get('spam_action', 'mute')
+        summary = f"{member.mention} was {REASON_TEXT[reason]} in {message.channel.mention}."
+        print(f"[AntiSpam] {member} ({member.id}) tripped {reason} in #{message.channel}")
+
+        moderation_cog = self.bot.get_cog('Moderation')
+        if action == 'mute' and moderation_cog:
+            duration = self.config.get('spam_mute_duration', '10m')
+            case = await moderation_cog.auto_mute(member, duration, f"Anti-spam: {REASON_TEXT[reason]}")
+            if case:
+                summary += f" Muted for {duration} (case #{case['case_id']})."
+        await self._alert(message.guild, "🚨 Spam detected", summary)
+
+    async def _handle_raid(self, guild):
+        limits = self.detector.limits['join_rate']
+        summary = f"{limits['count']} members joined within {limits['window']} seconds."
+        print(f"[AntiSpam] Join raid detected in {guild.name}")
+
+        moderation_cog = self.bot.get_cog('Moderation')
+        if self.config.get('raid_action', 'lockdown') == 'lockdown' and moderation_cog:
+            if moderation_cog.data.get('lockdown_active'):
+                summary += " A lockdown is already active."
+            else:
+                locked, failed = await moderation_cog.lock_guild(guild, self.config.get('raid_lockdown_message'))
+                summary += f" Locked {locked} channels" + (f" ({failed} failed)" if failed else "") + ". Use /lockdown end once it is over."
+        await self._alert(guild, "🚨 Possible raid", summary)
+
+    async def _alert(self, guild, title, description):
+        channel_id = self.config.get('alert_channel_id')
+        if not channel_id:
+            channel_id = self.config_manager.load_config().get('moderation', {}).get('mod_log_channel_id')
+        channel = guild.get_channel(int(channel_id)) if channel_id else None
+        if channel is None:
+            print(f"[AntiSpam] No alert channel available: {description}")
+            return
+        embed = discord.Embed(title=title, description=description, color=discord.Color.red(), timestamp=discord.utils.utcnow())
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            print(f"[AntiSpam] Failed to send alert: {e}")
+
+async def setup(bot):
+    await bot.add_cog(AntiSpam(bot))
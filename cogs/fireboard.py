@@ -1,9 +1,16 @@
-﻿import json
+﻿import asyncio
+import json
 import os
-from discord import Reaction, Member
+import discord
 from discord.ext import commands
 from utils.config_manager import ConfigManager  # Assuming your structure
 from utils.data_handler import DataHandler
+DEFAULT_HEADER = ":fire: **{count} Fires!** :fire:"
+def emoji_key(emoji):
+    """Custom emojis are keyed by ID, unicode emojis by the character itself."""
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return str(emoji.id) if emoji.id else emoji.name
 class Fireboard(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -11,111 +18,259 @@ class Fireboard(commands.Cog):
         self.config_manager = ConfigManager('config.json')
         self.config = self.config_manager.load_config()
         self.fire_config = self.config.get('fireboard', {})
-        self.posted_messages = self.load_fireboard_data()
-    async def fireboard_react_add(self, reaction: Reaction, user: Member):
+        self.boards = self.load_boards()
+        # Precomputed dispatch table: emoji key -> boards counting that emoji
+        self.boards_by_emoji = {}
+        for board in self.boards.values():
+            for key in board['emojis']:
+                self.boards_by_emoji.setdefault(key, []).append(board)
+        # Per-board index: original message ID -> (repost ID, original channel ID),
+        # plus the reverse repost ID -> (board name, original message ID)
+        self.posts = self.load_fireboard_data()
+        self.original_by_repost = {}
+        self.build_index()
+        # (board name, original message ID) -> {'message', 'reactors'}, oldest first, capped at max_tracked
+        self.tracked = {}
+        self._seeding = {}
+        self.max_tracked = self.fire_config.get('max_tracked', 1000)
+        # Repost edits are coalesced: at most one edit per message per edit_interval,
+        # always rendering the latest count, and skipped when the text is unchanged
+        self.edit_interval = self.fire_config.get('edit_interval', 2)
+        self._edit_tasks = {}     # (board name, original message ID) -> pending edit task
+        self._last_rendered = {}  # (board name, original message ID) -> content currently on the repost
+        self._channels = {}       # board channel ID -> channel
+        self._posting = set()     # (board name, original message ID) with a repost being sent
+    def load_boards(self):
+        """Boards from fireboard.boards, or a single 🔥 board from the legacy top-level keys."""
+        board_cfgs = self.fire_config.get('boards')
+        if not board_cfgs:
+            board_cfgs = [{
+                'name': 'fire',
+                'emojis': ['🔥'],
+                'required_reacts': self.fire_config.get('required_reacts', 5),
+                'channel_id': self.fire_config.get('channel_id'),
+            }]
+        boards = {}
+        for cfg in board_cfgs:
+            if not cfg.get('channel_id'):
+                print(f"Fireboard board {cfg.get('name')} has no channel_id, skipping.")
+                continue
+            emojis = cfg.get('emojis') or ['🔥']
+            boards[cfg['name']] = {
+                'name': cfg['name'],
+                'emojis': {emoji_key(e) for e in emojis},
+                'reaction': emojis[0],
+                'threshold': cfg.get('required_reacts', 5),
+                'channel_id': int(cfg['channel_id']),
+                'allow_channels': {int(c) for c in cfg.get('allow_channels', [])},
+                'deny_channels': {int(c) for c in cfg.get('deny_channels', [])},
+                'header': cfg.get('header', DEFAULT_HEADER),
+            }
+        return boards
+    def cog_unload(self):
+        for task in self._edit_tasks.values():
+            task.cancel()
+    async def board_channel(self, board):
+        """A board's channel, resolved from cache once and reused."""
+        channel = self._channels.get(board['channel_id'])
+        if channel is None:
+            channel = self.bot.get_channel(board['channel_id']) or await self.bot.fetch_channel(board['channel_id'])
+            self._channels[board['channel_id']] = channel
+        return channel
+    def render(self, board, message, fire_count):
+        return (
+            f"{board['header'].format(count=fire_count)}\n\n"
+            f"**Author:** {message.author.mention}\n"
+            f"**Message:** {message.content}\n"
+            f"[Jump to Message]({message.jump_url})"
+        )
+    def accepts_source(self, board, channel_id):
+        if channel_id == board['channel_id'] or channel_id in self._board_channel_ids:
+            return False
+        if board['allow_channels'] and channel_id not in board['allow_channels']:
+            return False
+        return channel_id not in board['deny_channels']
+    def resolve(self, payload):
+        """Map a reaction event to [(board, original message ID, original channel ID, place)]."""
+        key = emoji_key(payload.emoji)
+        repost = self.original_by_repost.get(payload.message_id)
+        if repost:
+            name, original_id = repost
+            board = self.boards.get(name)
+            if board is None or key not in board['emojis']:
+                return []
+            return [(board, original_id, self.posts[name][original_id][1], 'repost')]
+        return [
+            (board, payload.message_id, payload.channel_id, 'original')
+            for board in self.boards_by_emoji.get(key, ())
+            if self.accepts_source(board, payload.channel_id)
+        ]
+    async def get_state(self, board, original_id, channel_id):
+        """Reactor state for a message on a board, seeded with one full fetch the first time it is seen."""
+        state_key = (board['name'], original_id)
+        state = self.tracked.get(state_key)
+        if state is not None:
+            # Keep recently active messages at the end so eviction drops the stalest
+            self.tracked[state_key] = self.tracked.pop(state_key)
+            return state
+        task = self._seeding.get(state_key)
+        if task is None:
+            task = self._seeding[state_key] = asyncio.create_task(self.seed_state(board, original_id, channel_id))
         try:
-            if user.bot:
-                return
-            if reaction.emoji != '🔥':
-                print("Not a fire reaction")
+            return await task
+        finally:
+            self._seeding.pop(state_key, None)
+    async def seed_state(self, board, original_id, channel_id):
+        state_key = (board['name'], original_id)
+        original_channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+        original_message = await original_channel.fetch_message(original_id)
+        # user_id -> set of (place, emoji) the user reacted with, so a user reacting on both the
+        # original and the repost, or with several of the board's emojis, only counts once
+        reactors = {}
+        async def collect(message, place):
+            for react in message.reactions:
+                key = emoji_key(react.emoji)
+                if key in board['emojis']:
+                    async for reactor in react.users():
+                        if not reactor.bot and reactor.id != original_message.author.id:
+                            reactors.setdefault(reactor.id, set()).add((place, key))
+        await collect(original_message, 'original')
+        repost_id = self.posts[board['name']].get(original_id, (None, None))[0]
+        if repost_id:
+            fireboard_channel = await self.board_channel(board)
+            try:
+                repost = await fireboard_channel.fetch_message(repost_id)
+                self._last_rendered[state_key] = repost.content
+                await collect(repost, 'repost')
+            except discord.NotFound:
+                pass
+        state = {'message': original_message, 'reactors': reactors}
+        self.tracked[state_key] = state
+        while len(self.tracked) > self.max_tracked:
+            evicted = next(iter(self.tracked))
+            self.tracked.pop(evicted)
+            self._last_rendered.pop(evicted, None)
+        return state
+    async def fireboard_raw_react_add(self, payload):
+        try:
+            if payload.guild_id is None or (payload.member and payload.member.bot):
                 return
-            print(f"🔥 Fire reaction detected on message {reaction.message.id}")
-            message = reaction.message
-            guild = message.guild
-            fireboard_channel_id = self.fire_config.get('channel_id')
-            fire_threshold = self.fire_config.get('required_reacts', 5)
-            fireboard_channel = await self.bot.fetch_channel(fireboard_channel_id)
-            if not fireboard_channel:
-                print("Fireboard channel not found!")
+            key = emoji_key(payload.emoji)
+            for board, original_id, channel_id, place in self.resolve(payload):
+                state = await self.get_state(board, original_id, channel_id)
+                if payload.user_id != state['message'].author.id:
+                    state['reactors'].setdefault(payload.user_id, set()).add((place, key))
+                await self.update_board(board, original_id, state, allow_new=(place == 'original'))
+        except Exception as e:
+            print(f"Error in Fireboard on_raw_reaction_add: {e}")
+    async def fireboard_raw_react_remove(self, payload):
+        try:
+            if payload.guild_id is None:
                 return
-            # Helper to check if reacting to a repost
-            def find_original_message_id(repost_message_id):
-                for orig_id, data in self.posted_messages.items():
-                    if isinstance(data, dict) and 'repost_id' in data and str(data['repost_id']) == str(repost_message_id):
-                        return int(orig_id)
-                return None
-            original_message_id = find_original_message_id(message.id)
-            if original_message_id:
-                print("Reacting to reposted fireboard message")
-                # Fetch original message from correct original channel
-                original_channel_id = self.posted_messages[str(original_message_id)].get('channel_id')
-                original_channel = await self.bot.fetch_channel(original_channel_id)
-                original_message = await original_channel.fetch_message(original_message_id)
-                # Collect reactors from both original and repost
-                unique_fire_reactor_ids = set()
-                # Reactors from original message
-                for react in original_message.reactions:
-                    if react.emoji == '🔥':
-                        async for reactor in react.users():
-                            if not reactor.bot and reactor.id != original_message.author.id:
-                                unique_fire_reactor_ids.add(reactor.id)
-                # Reactors from reposted message
-                for react in message.reactions:
-                    if react.emoji == '🔥':
-                        async for reactor in react.users():
-                            if not reactor.bot and reactor.id != original_message.author.id:
-                                unique_fire_reactor_ids.add(reactor.id)
-                total_fire_count = len(unique_fire_reactor_ids)
-                # Edit repost
-                new_content = (
-                    f":fire: **{total_fire_count} Fires!** :fire:\n\n"
-                    f"**Author:** {original_message.author.mention}\n"
-                    f"**Message:** {original_message.content}\n"
-                    f"[Jump to Message]({original_message.jump_url})"
-                )
-                await message.edit(content=new_content)
-            else:
-                print("Reacting to original message")
-                # Count reactors on the original message only
-                fire_reactors = []
-                for react in message.reactions:
-                    if react.emoji == '🔥':
-                        async for reactor in react.users():
-                            if not reactor.bot and reactor.id != message.author.id:
-                                fire_reactors.append(reactor)
-                fire_count = len(set(fire_reactors))
-                if str(message.id) in self.posted_messages:
-                    # Already posted before, update repost
-                    repost_info = self.posted_messages.get(str(message.id), {})
-                    if isinstance(repost_info, dict) and 'repost_id' in repost_info:
-                        fireboard_msg = await fireboard_channel.fetch_message(repost_info['repost_id'])
-                        new_content = (
-                            f":fire: **{fire_count} Fires!** :fire:\n\n"
-                            f"**Author:** {message.author.mention}\n"
-                            f"**Message:** {message.content}\n"
-                            f"[Jump to Message]({message.jump_url})"
-                        )
-                        await fireboard_msg.edit(content=new_content)
-                elif fire_count >= fire_threshold:
-                    # New post to fireboard
-                    post = await fireboard_channel.send(
-                        f":fire: **{fire_count} Fires!** :fire:\n\n"
-                        f"**Author:** {message.author.mention}\n"
-                        f"**Message:** {message.content}\n"
-                        f"[Jump to Message]({message.jump_url})"
-                    )
-                    await post.add_reaction('🔥')
-                    # Save with extra info: repost ID and original channel ID
-                    self.posted_messages[str(message.id)] = {
-                        "repost_id": post.id,
-                        "channel_id": message.channel.id
-                    }
-                    self.save_fireboard_data()
+            key = emoji_key(payload.emoji)
+            for board, original_id, channel_id, place in self.resolve(payload):
+                state = await self.get_state(board, original_id, channel_id)
+                reactions = state['reactors'].get(payload.user_id)
+                if reactions is not None:
+                    reactions.discard((place, key))
+                    if not reactions:
+                        del state['reactors'][payload.user_id]
+                await self.update_board(board, original_id, state, allow_new=False)
         except Exception as e:
-            print(f"Error in Fireboard on_reaction_add: {e}")
+            print(f"Error in Fireboard on_raw_reaction_remove: {e}")
+    async def update_board(self, board, original_id, state, allow_new):
+        fire_count = len(state['reactors'])
+        message = state['message']
+        state_key = (board['name'], original_id)
+        board_posts = self.posts[board['name']]
+        if original_id in board_posts:
+            # Already posted before, update repost
+            if board_posts[original_id][0] and state_key not in self._edit_tasks:
+                self._edit_tasks[state_key] = asyncio.create_task(self.flush_edit(board, original_id))
+        elif allow_new and fire_count >= board['threshold'] and state_key not in self._posting:
+            # Claimed before the first await so a reaction arriving meanwhile
+            # can't see "no repost yet" and post a second one
+            self._posting.add(state_key)
+            try:
+                fireboard_channel = await self.board_channel(board)
+                if not fireboard_channel:
+                    print(f"Fireboard channel for board {board['name']} not found!")
+                    return
+                # New post to the board
+                content = self.render(board, message, fire_count)
+                post = await fireboard_channel.send(content)
+                self._last_rendered[state_key] = content
+                # Save with the repost ID and original channel ID
+                self.index_repost(board['name'], original_id, post.id, message.channel.id)
+                self.save_fireboard_data()
+            finally:
+                self._posting.discard(state_key)
+            await post.add_reaction(board['reaction'])
+            # Pick up reactions that came in while the repost was being sent
+            if len(state['reactors']) != fire_count and state_key not in self._edit_tasks:
+                self._edit_tasks[state_key] = asyncio.create_task(self.flush_edit(board, original_id))
     def load_fireboard_data(self):
+        """Load {board name: {original ID: (repost ID, channel ID)}}, migrating the old single-board format."""
+        posts = {name: {} for name in self.boards}
         # Ensure proper loading of data
         if os.path.exists('data/fireboard.json'):
             try:
                 data = self.data_handler.load_data()
-                return data.get('posted_messages', {})
             except json.JSONDecodeError:
                 print("Error decoding fireboard.json, resetting data.")
-                return {}
+                return posts
         else:
             print("No fireboard data file found, initializing new one.")
-            return {}
+            return posts
+        for name, entries in data.get('boards', {}).items():
+            board_posts = posts.setdefault(name, {})
+            for orig_id, (repost_id, channel_id) in entries.items():
+                board_posts[int(orig_id)] = (repost_id, channel_id)
+        # Old format: {"posted_messages": {orig: {"repost_id", "channel_id"}}} belongs to the first board
+        legacy = data.get('posted_messages', {})
+        if legacy and self.boards:
+            board_posts = posts[next(iter(self.boards))]
+            for orig_id, info in legacy.items():
+                if isinstance(info, dict):
+                    board_posts.setdefault(int(orig_id), (info.get('repost_id'), info.get('channel_id')))
+        return posts
+    async def flush_edit(self, board, original_id):
+        """Write the latest count to the repost once the edit interval has passed."""
+        state_key = (board['name'], original_id)
+        try:
+            await asyncio.sleep(self.edit_interval)
+        finally:
+            self._edit_tasks.pop(state_key, None)
+        state = self.tracked.get(state_key)
+        repost_id = self.posts[board['name']].get(original_id, (None, None))[0]
+        if state is None or not repost_id:
+            return
+        content = self.render(board, state['message'], len(state['reactors']))
+        if content == self._last_rendered.get(state_key):
+            return
+        try:
+            fireboard_channel = await self.board_channel(board)
+            await fireboard_channel.get_partial_message(repost_id).edit(content=content)
+            self._last_rendered[state_key] = content
+        except discord.HTTPException as e:
+            print(f"Error editing fireboard repost {repost_id}: {e}")
+    def build_index(self):
+        """Rebuild the repost -> original lookup from the per-board index."""
+        self.original_by_repost = {}
+        for name, board_posts in self.posts.items():
+            for orig_id, (repost_id, _) in board_posts.items():
+                if repost_id:
+                    self.original_by_repost[int(repost_id)] = (name, orig_id)
+        self._board_channel_ids = {board['channel_id'] for board in self.boards.values()}
+    def index_repost(self, name, original_id, repost_id, channel_id):
+        self.posts.setdefault(name, {})[int(original_id)] = (int(repost_id), int(channel_id))
+        self.original_by_repost[int(repost_id)] = (name, int(original_id))
     def save_fireboard_data(self):
-        self.data_handler.save_data({"posted_messages": self.posted_messages})
+        self.data_handler.save_data({
+            "boards": {
+                name: {str(orig_id): list(entry) for orig_id, entry in board_posts.items()}
+                for name, board_posts in self.posts.items()
+            }
+        })
 async def setup(bot):
-    await bot.add_cog(Fireboard(bot))
\ No newline at end of file
+    await bot.add_cog(Fireboard(bot))
@@ -1,3 +1,4 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -8,6 +9,7 @@ import requests
 import os
 
 from utils.config_manager import ConfigManager
+from utils.auto_defer import auto_defer, reply
 
 class IntroSystem(commands.Cog):
     def __init__(self, bot):
@@ -139,7 +141,7 @@ class IntroSystem(commands.Cog):
         if not self.config.get('enabled', True):
             print("[on_member_join] Intro system is disabled.")
             return
-        self.init_excel()
+        await asyncio.to_thread(self.init_excel)  # load_workbook is slow; keep it off the event loop
         if not self.worksheet:
             print("[on_member_join] Worksheet not loaded.")
             return
@@ -224,27 +226,29 @@ class IntroSystem(commands.Cog):
             print(f"[process_intro] Error: {e}")
 
     @app_commands.command(name="intro", description="Manually send your intro or someone else's")
+    @auto_defer()
     async def intro(self, interaction: discord.Interaction, member: discord.Member = None, row_num: int = None):
         print(f"[slash:/intro] Triggered by {interaction.user}")
         member = member or interaction.user
 
         if not await self.check_command_permissions(interaction, 'intro'):
-            await interaction.response.send_message("You don't have permission to use this command!", ephemeral=True)
+            await reply(interaction, "You don't have permission to use this command!", ephemeral=True)
             return
 
-        self.init_excel()
+        await asyncio.to_thread(self.init_excel)
         await self.process_intro(member, row_num)
-        await interaction.response.send_message(f"Intro processed for {member.mention}!")
+        await reply(interaction, f"Intro processed for {member.mention}!")
 
     @app_commands.command(name="refresh_intros", description="Refresh the intro Excel file from the cloud")
+    @auto_defer()
     async def refresh_intros(self, interaction: discord.Interaction):
         print(f"[slash:/refresh_intros] Triggered by {interaction.user}")
         if not await self.check_command_permissions(interaction, 'refresh_intros'):
-            await interaction.response.send_message("You don't have permission to use this command!", ephemeral=True)
+            await reply(interaction, "You don't have permission to use this command!", ephemeral=True)
             return
 
-        self.init_excel()
-        await interaction.response.send_message("Intro Excel file refreshed!")
+        await asyncio.to_thread(self.init_excel)
+        await reply(interaction, "Intro Excel file refreshed!")
 
 async def setup(bot):
     print("[IntroSystem] Cog setup called.")
@@ -1,32 +1,138 @@
-from discord import Member, Reaction
+from discord import Member
 from discord.ext import commands
+from discord import app_commands
 import discord
+from utils.config_manager import ConfigManager
+from utils.work_queue import WorkQueue
+from utils.perf import perf
+
+# Defaults for the per-subsystem on_message queues, overridable from config.json
+QUEUE_DEFAULTS = {
+    'leveling':  {'maxsize': 1000, 'overflow': 'drop_oldest'},
+    'analytics': {'maxsize': 1000, 'overflow': 'drop_oldest'},
+    'sticky':    {'maxsize': 100,  'overflow': 'coalesce'},
+}
+
+# What counts as "the same work" when a queue coalesces: one XP/analytics
+# update per member, one sticky repost per channel
+QUEUE_KEYS = {
+    'leveling':  lambda message: (message.channel.id, message.author.id),
+    'analytics': lambda message: (message.channel.id, message.author.id),
+    'sticky':    lambda message: message.channel.id,
+}
 
 class Listeners(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-
+        self.config_manager = ConfigManager('config.json')
+        self.config = self.config_manager.load_config().get('listeners', {})
+
+        self.command_configs = {
+            'queues': {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['administrator']},
+        }
+        for name, cfg in self.config.get('commands', {}).items():
+            if name in self.command_configs:
+                self.command_configs[name].update(cfg)
+
+        # on_message side effects run on these queues so a slow subsystem
+        # can't hold up the gateway dispatch for everything else
+        handlers = {
+            'leveling': self._run_leveling,
+            'analytics': self._run_analytics,
+            'sticky': self._run_sticky,
+        }
+        self.queues = {}
+        for name, handler in handlers.items():
+            cfg = dict(QUEUE_DEFAULTS[name])
+            cfg.update(self.config.get('queues', {}).get(name, {}))
+            self.queues[name] = WorkQueue(
+                name,
+                handler,
+                maxsize=cfg['maxsize'],
+                overflow=cfg['overflow'],
+                key=QUEUE_KEYS[name]
+            )
+
+    async def cog_load(self):
+        for queue in self.queues.values():
+            queue.start()
+
+    async def cog_unload(self):
+        for queue in self.queues.values():
+            await queue.stop()
+
+    async def check_command_permissions(self, interaction: discord.Interaction, command_name):
+        cfg = self.command_configs.get(command_name, {})
+        if not cfg.get('enabled', True):
+            return False
+        for perm in cfg.get('permissions', []):
+            if not getattr(interaction.user.guild_permissions, perm, False):
+                return False
+        req = cfg.get('required_roles', [])
+        if req and '@everyone' not in req:
+            user_roles = [str(r.id) for r in interaction.user.roles]
+            if not any(rid in user_roles for rid in req):
+                return False
+        return True
+
+    def queue_stats(self):
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+    @perf.instrument('queue.leveling')
+    async def _run_leveling(self, message):
         leveling_cog = self.bot.get_cog('Leveling')
-        analytics_cog = self.bot.get_cog('Analytics')
-        sticky_cog = self.bot.get_cog('Sticky')
-
         if leveling_cog:
             await leveling_cog.process_message_for_leveling(message)
 
+    @perf.instrument('queue.analytics')
+    async def _run_analytics(self, message):
+        analytics_cog = self.bot.get_cog('Analytics')
         if analytics_cog:
             await analytics_cog.process_message_for_analytics(message)
 
+    @perf.instrument('queue.sticky')
+    async def _run_sticky(self, message):
+        sticky_cog = self.bot.get_cog('Sticky')
         if sticky_cog:
             await sticky_cog.on_message(message)
 
+    @commands.Cog.listener()
+    @perf.instrument()
+    async def on_message(self, message):
+        if message.author.bot:
+            return
+
+        # Spam detection runs inline so floods are caught before they queue up
+        antispam_cog = self.bot.get_cog('AntiSpam')
+        if antispam_cog:
+            antispam_cog.check_message(message)
+
+        for queue in self.queues.values():
+            await queue.put(message)
+
         await self.bot.process_commands(message)  # So commands still work
 
+    @app_commands.command(name="queues", description="Show the depth of the message processing queues")
+    async def queues_cmd(self, interaction: discord.Interaction):
+        if not await self.check_command_permissions(interaction, 'queues'):
+            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+
+        embed = discord.Embed(title="Message Queues", color=discord.Color.blurple())
+        for name, st in self.queue_stats().items():
+            embed.add_field(
+                name=name.title(),
+                value=(
+                    f"Depth: {st['depth']}/{st['maxsize']} (peak {st['high_watermark']})\n"
+                    f"Policy: {st['overflow']}\n"
+                    f"Processed: {st['processed']} | Dropped: {st['dropped']} | "
+                    f"Coalesced: {st['coalesced']} | Errors: {st['errors']}"
+                ),
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_presence_update(self, before, after):
         if before.bot:
             return  # filter bots
@@ -37,25 +143,29 @@ class Listeners(commands.Cog):
             await analytics_cog.process_status_change(before, after)
 
     @commands.Cog.listener()
-    async def on_reaction_add(self, reaction: Reaction, user: Member):  # <-- fixed here
-        print(f"Reaction added: {reaction.emoji} by {user.name}")
+    @perf.instrument()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        fireboard_cog = self.bot.get_cog('Fireboard')
+
+        if fireboard_cog:
+            await fireboard_cog.fireboard_raw_react_add(payload)
+
+    @commands.Cog.listener()
+    @perf.instrument()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
         fireboard_cog = self.bot.get_cog('Fireboard')
 
         if fireboard_cog:
-            await fireboard_cog.fireboard_react_add(reaction, user)  # <-- fixed call
+            await fireboard_cog.fireboard_raw_react_remove(payload)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_member_remove(self, member: Member):
-        # """Log the roles when a member leaves the server."""
-        # gid, uid = str(member.guild.id), str(member.id)
-        # pr = self.data.setdefault('persisted_roles', {}).setdefault(gid, {})
-        # lst = pr.setdefault(uid, [])
-        
-        # # Save current roles to the persisted roles list
-        # current_roles = [role.id for role in member.roles if role.id in lst]
-        # pr[uid] = current_roles
-        # self.data.save_data()  # Assuming save_data is a method of your data handler
-        # print(f"Logged persistent roles for {member.name} when they left: {current_roles}")
+        moderation_cog = self.bot.get_cog('Moderation')
+
+        if moderation_cog:
+            moderation_cog.role_index.member_remove(member)
+            moderation_cog.snapshot_roles(member)
 
         logging_cog = self.bot.get_cog('Logging')
 
@@ -63,20 +173,19 @@ class Listeners(commands.Cog):
             await logging_cog.on_member_remove(member)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_member_join(self, member: Member):
-        # """Reassign persistent roles when a member rejoins the server."""
-        # gid, uid = str(member.guild.id), str(member.id)
-        # pr = self.data.get('persisted_roles', {}).get(gid, {})
-        
-        # # Check if the member had persistent roles saved
-        # persistent_roles = pr.get(uid, [])
-        
-        # # Reassign any roles that were marked as persistent
-        # for role_id in persistent_roles:
-        #     role = discord.utils.get(member.guild.roles, id=role_id)
-        #     if role:
-        #         await member.add_roles(role)
-        #         print(f"Reassigned persistent role {role.name} to {member.name}.")
+        # Raid detection goes first so nothing below can delay it
+        antispam_cog = self.bot.get_cog('AntiSpam')
+
+        if antispam_cog:
+            antispam_cog.check_join(member)
+
+        moderation_cog = self.bot.get_cog('Moderation')
+
+        if moderation_cog:
+            moderation_cog.role_index.member_join(member)
+            moderation_cog.queue_role_restore(member)
 
         logging_cog = self.bot.get_cog('Logging')
 
@@ -89,6 +198,7 @@ class Listeners(commands.Cog):
             await intro_cog.on_member_join(member)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_ready(self):
         sticky_cog = self.bot.get_cog('Sticky')
 
@@ -96,6 +206,7 @@ class Listeners(commands.Cog):
             await sticky_cog.sticky_on_ready()
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_message_delete(self, message):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -103,6 +214,7 @@ class Listeners(commands.Cog):
             await logging_cog.message_delete(message)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_message_edit(self, before, after):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -110,6 +222,7 @@ class Listeners(commands.Cog):
             await logging_cog.message_edit(before, after)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def bulk_message_delete(self, messages):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -117,6 +230,7 @@ class Listeners(commands.Cog):
             await logging_cog.bulk_message_delete(messages)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def image_message_delete(self, message):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -124,13 +238,20 @@ class Listeners(commands.Cog):
             await logging_cog.image_message_delete(message)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_member_update(self, before, after):
+        moderation_cog = self.bot.get_cog('Moderation')
+
+        if moderation_cog:
+            moderation_cog.role_index.member_update(before, after)
+
         logging_cog = self.bot.get_cog('Logging')
 
         if logging_cog:
             await logging_cog.on_member_update(before, after)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_member_ban(self, guild, user):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -138,6 +259,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_member_ban(guild, user)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_member_unban(self, guild, user):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -145,6 +267,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_member_unban(guild, user)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_role_create(self, role):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -152,13 +275,20 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_role_create(role)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_role_delete(self, role):
+        moderation_cog = self.bot.get_cog('Moderation')
+
+        if moderation_cog:
+            moderation_cog.role_index.role_delete(role)
+
         logging_cog = self.bot.get_cog('Logging')
 
         if logging_cog:
             await logging_cog.on_guild_role_delete(role)
     
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_role_update(self, before, after):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -166,6 +296,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_role_update(before, after)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_channel_create(self, channel):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -173,6 +304,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_channel_create(channel)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_channel_delete(self, channel):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -180,6 +312,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_channel_delete(channel)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_emoji_create(self, emoji):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -187,6 +320,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_emoji_create(emoji)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_emoji_delete(self, emoji):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -194,6 +328,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_guild_emoji_delete(emoji)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_voice_state_update(self, member, before, after):
         logging_cog = self.bot.get_cog('Logging')
 
@@ -201,6 +336,7 @@ class Listeners(commands.Cog):
             await logging_cog.on_voice_state_update(member, before, after)
 
     @commands.Cog.listener()
+    @perf.instrument()
     async def on_guild_channel_update(self, before, after):
         logging_cog = self.bot.get_cog('Logging')
 
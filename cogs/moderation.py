@@ -2,10 +2,49 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 import datetime
+import heapq
+import io
+import itertools
+import re
 from utils.data_handler import DataHandler
 from utils.config_manager import ConfigManager
+from utils.modlog_store import ModlogStore
+from utils.role_index import RoleIndex
+from utils.search_index import SearchIndex
+from utils.escalation import WarningEscalation
+from utils.dm_outbox import DmOutbox
+from utils.role_snapshots import RoleSnapshots
+from utils.auto_defer import auto_defer, defer, reply
 import asyncio
 
+# Timed actions that fail (e.g. the guild is unavailable during an outage) are
+# retried with exponential backoff, capped, and dropped after this many attempts
+TIMED_RETRY_BASE = 30
+TIMED_RETRY_MAX = 3600
+TIMED_MAX_ATTEMPTS = 10
+
+# Lockdown runs channel overwrites concurrently; discord.py still honours the
+# per-route rate limits, these just bound how many requests are in flight.
+LOCKDOWN_SAVE_INTERVAL = 2       # seconds between incremental saves of locked_channels
+LOCKDOWN_PROGRESS_INTERVAL = 2   # seconds between progress message edits
+
+# How long a ban/kick waits for the target's DM before acting; once they are
+# removed from the server the bot usually can't DM them any more
+DM_BEFORE_REMOVAL_TIMEOUT = 1
+
+# Discord only bulk-deletes messages younger than 14 days; keep a little margin
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14, minutes=-5)
+BULK_DELETE_BATCH = 100
+
+# Expired persisted-role entries are swept at most this often
+ROLE_PERSIST_SWEEP_INTERVAL = 24 * 60 * 60
+
+# A mention plus its ", " is at most 25 characters, so 70 per page leaves room
+# for the header and footer lines under Discord's 2000-character message limit
+MEMBERS_PAGE_SIZE = 70
+MESSAGE_LIMIT = 2000
+MODSEARCH_PAGE_SIZE = 5
+
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -14,7 +53,34 @@ class Moderation(commands.Cog):
         self.data = self.data_handler.load_data()
         self.config_manager = ConfigManager('config.json')
         self.config = self.config_manager.load_config().get('moderation', {})
+
+        # Cases live in append-only segment files; older installs kept them in moderation.json
+        self.modlogs = ModlogStore(self.config.get('modlog_dir', 'data/modlogs'))
+        if self.data.get('modlogs'):
+            moved = self.modlogs.import_legacy(self.data['modlogs'])
+            del self.data['modlogs']
+            self.data_handler.save_data(self.data)
+            print(f"[Moderation] Migrated {moved} modlog cases to {self.modlogs.base_dir}")
         
+        # Persisted roles are packed per member in their own file; older installs kept them in moderation.json
+        self.role_snapshots = RoleSnapshots(
+            self.config.get('role_persist_file', 'data/role_persist.json'),
+            parse_time(self.config.get('role_persist_retention', '90d'))
+        )
+        self._last_role_sweep = 0
+        self._role_tasks = set()
+        if self.data.get('persisted_roles'):
+            moved = self.role_snapshots.import_legacy(self.data['persisted_roles'])
+            del self.data['persisted_roles']
+            self.data_handler.save_data(self.data)
+            print(f"[Moderation] Migrated persisted roles for {moved} members")
+
+        # Stored as a list in JSON; everything below treats it as a set
+        self.data['locked_channels'] = set(self.data.get('locked_channels', []))
+        if self.data.get('lockdown_state'):
+            print(f"[Moderation] A lockdown was interrupted while {self.data['lockdown_state']}. "
+                  "Run /lockdown start to resume it or /lockdown end to roll it back.")
+
         # Command configs (permissions & roles from config.json)
         self.command_configs = {
             'deafen':       {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['deafen_members']},
@@ -48,10 +114,71 @@ class Moderation(commands.Cog):
             'duration':     {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['kick_members']},
             'clean':        {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['manage_messages']},
             'fireboard':    {'enabled': True, 'required_roles': ['@everyone'], 'permissions': []},
+            'mass_ban':     {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['ban_members']},
+            'mass_kick':    {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['kick_members']},
+            'mass_mute':    {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['manage_roles']},
+            'mass_temprole': {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['manage_roles']},
+            'modsearch':    {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['kick_members']},
         }
         self.update_configs()
-        # start background loop
-        self._timed_loop.start()
+
+        # Timed actions: a min-heap of (due, seq, action) over self.data['timed'].
+        # The worker sleeps until the earliest due time and is woken early when
+        # a new action is scheduled. _timed_live maps id(action) to the seq of
+        # its current heap entry; any other entry for it is stale.
+        self._timed_heap = []
+        self._timed_seq = itertools.count()
+        self._timed_live = {}
+        self._timed_wakeup = asyncio.Event()
+        self._timed_task = None
+
+        # Moderation notices are DMed in the background so commands don't wait on them
+        self.outbox = DmOutbox(
+            maxsize=self.config.get('dm_queue_size', 500),
+            max_attempts=self.config.get('dm_max_attempts', 4)
+        )
+
+        # role -> member IDs for /members, kept current by Listeners' member events
+        self.role_index = RoleIndex()
+
+        # guild_id -> SearchIndex over case reasons, warnings and notes for /modsearch.
+        # Built for every guild in a worker thread when the cog loads, then kept
+        # current by the commands that write. Updates made while the build runs
+        # are queued in _search_pending and replayed once it finishes.
+        self.search_indexes = {}
+        self._search_pending = []
+        self._search_build = None
+
+        # Warning thresholds, e.g. 3 warnings in 7 days -> 1h mute
+        rules = []
+        for rule in self.config.get('escalation', []):
+            try:
+                window = parse_time(rule['window'])
+                parse_time(rule.get('duration'))
+            except (KeyError, ValueError) as e:
+                print(f"[Moderation] Ignoring escalation rule {rule}: {e}")
+                continue
+            rules.append({**rule, 'window': window, 'window_text': rule['window']})
+        self.escalation = WarningEscalation(rules, self.data.setdefault('escalation_fired', {}))
+        for action in self.data.get('timed', []):
+            self._push_timed(action)
+
+    async def cog_load(self):
+        # start background worker
+        self._timed_task = asyncio.create_task(self._timed_worker())
+        self.outbox.start()
+        self._last_role_sweep = self._now()
+        self.role_snapshots.expire()
+        self._search_build = asyncio.create_task(self._build_search_indexes())
+
+    async def cog_unload(self):
+        if self._timed_task:
+            self._timed_task.cancel()
+        if self._search_build:
+            self._search_build.cancel()
+        for task in self._role_tasks:
+            task.cancel()
+        await self.outbox.stop()
 
     def update_configs(self):
         if 'commands' in self.config:
@@ -75,70 +202,235 @@ class Moderation(commands.Cog):
                 return False
         return True
 
-    # background loop to handle timed actions
-    @tasks.loop(seconds=30)
-    async def _timed_loop(self):
-        now = datetime.datetime.utcnow().timestamp()
-        new = []
-        for action in self.data.get('timed', []):
-            if now >= action['end']:
-                guild = self.bot.get_guild(action['guild_id'])
-                user_id = action['user_id']
-                if action['type']=='ban':
-                    await guild.unban(discord.Object(id=user_id))
-                elif action['type']=='mute':
-                    member = guild.get_member(user_id)
-                    role = guild.get_role(int(self.config['mute_role']))
-                    if member and role:
-                        await member.remove_roles(role)
-                        await member.send(self.config['unmute_message'].format(reason='Time expired'))
-                elif action['type']=='temprole':
-                    member = guild.get_member(user_id)
-                    role = guild.get_role(action['role_id'])
-                    if member and role:
-                        await member.remove_roles(role)
-                elif action['type']=='unlock_ch':
-                    channel = guild.get_channel(action['channel_id'])
-                    await channel.set_permissions(guild.default_role, send_messages=True)
-                # no re-apply for lockdown
-            else:
-                new.append(action)
-        self.data['timed'] = new
+    # --- TIMED ACTIONS ---
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.utcnow().timestamp()
+
+    @staticmethod
+    def _due(action):
+        return action.get('retry_at', action['end'])
+
+    def _push_timed(self, action):
+        seq = next(self._timed_seq)
+        self._timed_live[id(action)] = seq
+        heapq.heappush(self._timed_heap, (self._due(action), seq, action))
+        self._timed_wakeup.set()
+
+    def schedule_timed(self, action):
+        """Add a timed action, persist it and wake the worker if it is now the earliest."""
+        self.schedule_timed_many([action])
+
+    def schedule_timed_many(self, actions):
+        """Add several timed actions with a single save."""
+        if not actions:
+            return
+        self.data.setdefault('timed', []).extend(actions)
+        self.data_handler.save_data(self.data)
+        for action in actions:
+            self._push_timed(action)
+
+    def reschedule_timed(self, action):
+        """Re-queue an action whose end time changed; its old heap entry goes stale."""
+        action.pop('retry_at', None)
+        action.pop('attempts', None)
+        self._push_timed(action)
+
+    def _finish_timed(self, action):
+        self._timed_live.pop(id(action), None)
+        timed = self.data.get('timed', [])
+        for i, a in enumerate(timed):
+            if a is action:
+                del timed[i]
+                break
         self.data_handler.save_data(self.data)
 
-    @commands.Cog.listener()
-    async def on_member_join(self, member):
-        gid, uid = str(member.guild.id), str(member.id)
-        for rid in self.data.get('persisted_roles', {}).get(gid, {}).get(uid, []):
-            role = member.guild.get_role(rid)
-            if role:
-                await member.add_roles(role)
+    async def _timed_worker(self):
+        await self.bot.wait_until_ready()
+        while True:
+            self._timed_wakeup.clear()
+            if not self._timed_heap:
+                await self._timed_wakeup.wait()
+                continue
+
+            due, seq, action = self._timed_heap[0]
+            delay = due - self._now()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._timed_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._timed_heap)
+            if self._timed_live.get(id(action)) != seq:
+                continue  # stale entry, the action was rescheduled
+
+            try:
+                await self._run_timed_action(action)
+            except Exception as e:
+                attempts = action.get('attempts', 0) + 1
+                if attempts >= TIMED_MAX_ATTEMPTS:
+                    print(f"[Moderation] Giving up on timed {action['type']} for {action.get('user_id') or action.get('channel_id')}: {e}")
+                    self._finish_timed(action)
+                    continue
+                backoff = min(TIMED_RETRY_BASE * 2 ** (attempts - 1), TIMED_RETRY_MAX)
+                print(f"[Moderation] Timed {action['type']} failed ({e}), retrying in {backoff}s")
+                action['attempts'] = attempts
+                action['retry_at'] = self._now() + backoff
+                self._push_timed(action)
+            else:
+                self._finish_timed(action)
+
+    async def _run_timed_action(self, action):
+        guild = self.bot.get_guild(action['guild_id'])
+        if guild is None:
+            raise LookupError(f"guild {action['guild_id']} unavailable")
+        user_id = action.get('user_id')
+        if action['type']=='ban':
+            try:
+                await guild.unban(discord.Object(id=user_id))
+            except discord.NotFound:
+                pass  # already unbanned
+        elif action['type']=='mute':
+            member = guild.get_member(user_id)
+            role = guild.get_role(int(self.config['mute_role']))
+            if member and role:
+                await member.remove_roles(role)
+                await self.outbox.send(member, self.config['unmute_message'].format(reason='Time expired'))
+        elif action['type']=='temprole':
+            member = guild.get_member(user_id)
+            role = guild.get_role(action['role_id'])
+            if member and role:
+                await member.remove_roles(role)
+        elif action['type']=='unlock_ch':
+            channel = guild.get_channel(action['channel_id'])
+            if channel:
+                await channel.set_permissions(guild.default_role, send_messages=True)
+        # no re-apply for lockdown
+
+    # --- PERSISTED ROLES ---
+
+    def snapshot_roles(self, member):
+        """Called by Listeners when a member leaves; keeps the persisted roles they still had."""
+        if self.role_snapshots.member_left(member):
+            print(f"[Moderation] Kept persisted roles for {member} ({member.id})")
+        if self._now() - self._last_role_sweep >= ROLE_PERSIST_SWEEP_INTERVAL:
+            self._last_role_sweep = self._now()
+            expired = self.role_snapshots.expire()
+            if expired:
+                print(f"[Moderation] Expired persisted roles for {expired} members")
+
+    def queue_role_restore(self, member):
+        """Called by Listeners when a member joins; restores their persisted roles in the background."""
+        task = asyncio.create_task(self.restore_roles(member))
+        self._role_tasks.add(task)
+        task.add_done_callback(self._role_tasks.discard)
+
+    async def restore_roles(self, member):
+        """Reapply a member's persisted roles in one request."""
+        role_ids = self.role_snapshots.member_joined(member)
+        if not role_ids:
+            return
+        # member.edit(roles=...) fails as a whole on a single role the bot can't
+        # assign, so leave out deleted, managed and too-high roles up front
+        top = member.guild.me.top_role
+        roles = [r for r in map(member.guild.get_role, role_ids) if r and not r.managed and not r.is_default() and r < top]
+        if not roles:
+            return
+        current = [r for r in member.roles if not r.is_default()]
+        try:
+            await member.edit(roles=list({*current, *roles}), reason="Persisted roles")
+        except discord.HTTPException as e:
+            print(f"[Moderation] Failed to restore roles for {member}: {e}")
+            return
+        print(f"[Moderation] Restored {len(roles)} persisted roles for {member}")
 
     # --- COMMANDS ---
 
-    @app_commands.command(name="clean", description="Clean up the bot's responses")
-    @app_commands.describe(amount="Number of messages to clean (default 10)")
-    async def clean(self, interaction: discord.Interaction, amount: int = 10):
-        """Clean up the bot's responses."""
+    @app_commands.command(name="clean", description="Clean up the bot's responses, or messages matching filters")
+    @app_commands.describe(
+        amount="Number of messages to delete (default 10)",
+        user="Only messages from this member",
+        pattern="Only messages whose content matches this regex",
+        attachments="Only messages with attachments",
+        bots="Only messages from bots"
+    )
+    @auto_defer(ephemeral=True)
+    async def clean(self, interaction: discord.Interaction, amount: app_commands.Range[int, 1, 1000] = 10,
+                    user: discord.Member = None, pattern: str = None, attachments: bool = False, bots: bool = False):
+        """Clean up the bot's responses, or messages matching the given filters."""
         if not await self.check_command_permissions(interaction, 'clean'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
+
+        try:
+            regex = re.compile(pattern, re.IGNORECASE) if pattern else None
+        except re.error as e:
+            return await reply(interaction, f"❌ Invalid pattern: {e}", ephemeral=True)
     
-        await interaction.response.defer(ephemeral=True)
+        await defer(interaction, ephemeral=True)
+
+        filtered = user or regex or attachments or bots
+        def matches(m):
+            if not filtered:
+                return m.author == self.bot.user
+            if user and m.author.id != user.id:
+                return False
+            if bots and not m.author.bot:
+                return False
+            if attachments and not m.attachments:
+                return False
+            if regex and not regex.search(m.content):
+                return False
+            return True
 
-        def is_bot(m): return m.author == self.bot.user
-        deleted = await interaction.channel.purge(limit=1000, check=is_bot)
-        count = min(len(deleted), amount)
+        count = await self.purge_matching(interaction.channel, matches, amount)
 
         # Send the followup message
-        message = await interaction.followup.send(
-            self.config.get('clean_message', f"Deleted {count} messages."),
-            ephemeral=True
-        )
+        text = f"Deleted {count} messages." if filtered else self.config.get('clean_message', f"Deleted {count} messages.")
+        message = await interaction.followup.send(text, ephemeral=True)
 
         # ❗️Manually delete it after 5 seconds
         await asyncio.sleep(5)
         await message.delete()
 
+    async def purge_matching(self, channel, check, amount):
+        """Delete the newest `amount` messages passing `check`. Returns how many were deleted.
+
+        History is streamed and the walk stops as soon as `amount` matches are
+        found (or after clean_scan_limit messages). Recent messages go out in
+        bulk-delete batches of up to 100, older ones one at a time.
+        """
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        batch, deleted, matched = [], 0, 0
+
+        async def flush():
+            nonlocal batch, deleted
+            if batch:
+                await channel.delete_messages(batch)
+                deleted += len(batch)
+                batch = []
+
+        async for message in channel.history(limit=self.config.get('clean_scan_limit', 1000)):
+            if not check(message):
+                continue
+            matched += 1
+            if message.created_at > cutoff:
+                batch.append(message)
+                if len(batch) >= BULK_DELETE_BATCH:
+                    await flush()
+            else:
+                try:
+                    await message.delete()
+                    deleted += 1
+                except discord.NotFound:
+                    pass
+            if matched >= amount:
+                break
+        await flush()
+        return deleted
+
 
     @app_commands.command(name="deafen", description="Deafen a member in voice channel")
     @app_commands.describe(member="Member to deafen")
@@ -168,22 +460,22 @@ class Moderation(commands.Cog):
         member="Member to kick",
         reason="Reason for kick"
     )
+    @auto_defer()
     async def kick(self, interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
         """Kick a member."""
         if not await self.check_command_permissions(interaction, 'kick'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
 
         if interaction.user.top_role <= member.top_role:
-            await interaction.response.send_message("You cannot moderate this member as they are higher ranked.")
+            await reply(interaction, "You cannot moderate this member as they are higher ranked.")
             return
 
         dm = self.config['kick_message'].format(reason=reason)
-        try:
-            await member.send(dm)
-        except discord.Forbidden:
-            pass
+        # Acknowledge first so a slow DM can't use up the interaction deadline
+        await defer(interaction)
+        await self.outbox.send_now(member, dm, DM_BEFORE_REMOVAL_TIMEOUT)
         await member.kick(reason=reason)
-        await interaction.response.send_message(f"👢 Kicked {member.mention}")
+        await reply(interaction, f"👢 Kicked {member.mention}")
         await self.log(interaction, "Kick", member, reason)
 
     @app_commands.command(name="ban", description="Ban a member from the server")
@@ -192,30 +484,29 @@ class Moderation(commands.Cog):
         duration="Duration of ban (e.g. 1d, 2h)",
         reason="Reason for ban"
     )
+    @auto_defer()
     async def ban(self, interaction: discord.Interaction, member: discord.Member, duration: str = None, reason: str = "No reason provided"):
         """Ban a member, optionally timed."""
         if not await self.check_command_permissions(interaction, 'ban'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
 
         if interaction.user.top_role <= member.top_role:
-            await interaction.response.send_message("You cannot moderate this member as they are higher ranked.")
+            await reply(interaction, "You cannot moderate this member as they are higher ranked.")
             return
 
         dm = self.config['ban_message'].format(duration=duration or "permanently", reason=reason)
-        try:
-            await member.send(dm)
-        except discord.Forbidden:
-            pass
+        # Acknowledge first so a slow DM can't use up the interaction deadline
+        await defer(interaction)
+        await self.outbox.send_now(member, dm, DM_BEFORE_REMOVAL_TIMEOUT)
         await member.ban(reason=reason)
-        await interaction.response.send_message(f"🔨 Banned {member.mention}")
+        await reply(interaction, f"🔨 Banned {member.mention}")
         await self.log(interaction, "Ban", member, reason, duration)
         if duration:
             end = datetime.datetime.utcnow().timestamp() + parse_time(duration)
-            self.data.setdefault('timed', []).append({
+            self.schedule_timed({
                 'type':'ban','user_id':member.id,
                 'guild_id':interaction.guild.id,'end':end
             })
-            self.data_handler.save_data(self.data)
 
     @app_commands.command(name="unban", description="Unban a user from the server")
     @app_commands.describe(
@@ -259,37 +550,49 @@ class Moderation(commands.Cog):
         await interaction.response.send_message(f"🛑 Softbanned {member.mention}")
         await self.log(interaction, "Softban", member, reason)
 
-    @app_commands.command(name="members", description="List members in specified roles")
-    @app_commands.describe(roles="Roles to check (mention or ID)")
-    async def members(self, interaction: discord.Interaction, roles: str):
-        """List members in specified role(s) with member count"""
+    @app_commands.command(name="members", description="List members matching a role expression")
+    @app_commands.describe(
+        roles="Roles to check (mention or ID), combined with & (and), | (or), - (except) and parentheses",
+        page="Page number (default 1)",
+        as_file="Send the full list as a text file"
+    )
+    @auto_defer(ephemeral=True)
+    async def members(self, interaction: discord.Interaction, roles: str, page: int = 1, as_file: bool = False):
+        """List members matching a role expression with member count"""
         if not await self.check_command_permissions(interaction, 'members'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
     
-        # Parse role mentions/IDs from the input string
-        role_objects = []
-        for part in roles.split():
-            try:
-                role_id = int(part.strip('<@&>'))
-                role = interaction.guild.get_role(role_id)
-                if role:
-                    role_objects.append(role)
-            except ValueError:
-                continue
-            
-        if not role_objects:
-            return await interaction.response.send_message(
-                "❌ No valid roles provided. Mention roles or use their IDs.",
+        # Roles separated only by spaces are a union, as before
+        try:
+            member_ids, role_objects = self.role_index.evaluate(interaction.guild, roles)
+        except ValueError as e:
+            return await reply(
+                interaction,
+                f"❌ {e}. Mention roles or use their IDs, e.g. `@A & @B - @C`.",
                 ephemeral=True
             )
     
-        # Get unique members from all specified roles (max 5 roles)
-        unique_members = set()
-        for role in role_objects[:5]:
-            unique_members.update(role.members)
-    
-        member_count = len(unique_members)
-        mentions = [m.mention for m in list(unique_members)[:90]]  # Still limit mentions to 90
+        member_count = len(member_ids)
+        ordered = sorted(member_ids)
+        role_names = ", ".join(f"'{r.name}'" for r in role_objects)
+
+        if as_file:
+            lines = []
+            for uid in ordered:
+                member = interaction.guild.get_member(uid)
+                lines.append(f"{uid}\t{member or ''}")
+            file = discord.File(io.BytesIO("\n".join(lines).encode('utf-8')), filename="members.txt")
+            return await reply(
+                interaction,
+                f"**Found {member_count} members matching {role_names}.**",
+                file=file,
+                ephemeral=True
+            )
+
+        pages = max(1, -(-member_count // MEMBERS_PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * MEMBERS_PAGE_SIZE
+        mentions = [f"<@{uid}>" for uid in ordered[start:start + MEMBERS_PAGE_SIZE]]
     
         # Create the response message
         response_parts = [
@@ -302,57 +605,71 @@ class Moderation(commands.Cog):
         else:
             response_parts.append("No members found in these roles.")
     
-        # Add role names for clarity
-        role_names = ", ".join(f"'{r.name}'" for r in role_objects[:5])
-        if len(role_objects) > 5:
-            role_names += f" (and {len(role_objects)-5} more)"
+        footer = []
+        if pages > 1:
+            footer.append(f"*Page {page}/{pages}. Use `page` to see more or `as_file` for the full list.*")
+
+        # Add role names for clarity, shortened if a long role list would overflow the message
+        budget = MESSAGE_LIMIT - len("\n".join(response_parts + footer)) - len("\n\n*Roles checked: *") - 1
+        if len(role_names) > budget:
+            role_names = role_names[:max(0, budget - 1)] + "…"
         response_parts.append(f"\n*Roles checked: {role_names}*")
+        response_parts.extend(footer)
     
-        await interaction.response.send_message(
+        await reply(
+            interaction,
             "\n".join(response_parts),
             ephemeral=True
         )
 
-    # @app_commands.command(name="rolepersist", description="Manage persistent roles")
-    # @app_commands.describe(
-    #     action="Action to perform",
-    #     member="Member to affect",
-    #     role="Role to persist"
-    # )
-    # @app_commands.choices(action=[
-    #     app_commands.Choice(name="add", value="add"),
-    #     app_commands.Choice(name="remove", value="remove"),
-    #     app_commands.Choice(name="toggle", value="toggle"),
-    # ])
-    # async def rolepersist(self, interaction: discord.Interaction, 
-    #                      action: app_commands.Choice[str], 
-    #                      member: discord.Member, 
-    #                      role: discord.Role):
-    #     """Add/remove/toggle a persistent role."""
-    #     if not await self.check_command_permissions(interaction, 'rolepersist'):
-    #         return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+    @app_commands.command(name="rolepersist", description="Manage persistent roles")
+    @app_commands.describe(
+        action="Action to perform",
+        member="Member to affect",
+        role="Role to persist"
+    )
+    @app_commands.choices(action=[
+        app_commands.Choice(name="add", value="add"),
+        app_commands.Choice(name="remove", value="remove"),
+        app_commands.Choice(name="toggle", value="toggle"),
+    ])
+    @auto_defer()
+    async def rolepersist(self, interaction: discord.Interaction, 
+                         action: app_commands.Choice[str], 
+                         member: discord.Member, 
+                         role: discord.Role):
+        """Add/remove/toggle a persistent role."""
+        if not await self.check_command_permissions(interaction, 'rolepersist'):
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
+
+        if interaction.user.top_role <= member.top_role:
+            return await reply(interaction, "You cannot moderate this member as they are higher ranked.")
+
+        if role >= interaction.user.top_role:
+            return await reply(interaction, "❌ You cannot manage a role at or above your highest role.", ephemeral=True)
+
+        if role >= interaction.guild.me.top_role or role.managed:
+            return await reply(interaction, "❌ I can't assign that role; it is managed or not below my highest role.", ephemeral=True)
         
-    #     gid, uid = str(interaction.guild.id), str(member.id)
-    #     pr = self.data.setdefault('persisted_roles', {}).setdefault(gid, {})
-    #     lst = pr.setdefault(uid, [])
+        gid, uid = interaction.guild.id, member.id
+        persisted = self.role_snapshots.roles(gid, uid)
         
-    #     action_value = action.value
-    #     if action_value == 'add' and role.id not in lst:
-    #         lst.append(role.id)
-    #         await member.add_roles(role)
-    #     elif action_value == 'remove' and role.id in lst:
-    #         lst.remove(role.id)
-    #         await member.remove_roles(role)
-    #     elif action_value == 'toggle':
-    #         if role.id in lst:
-    #             lst.remove(role.id)
-    #             await member.remove_roles(role)
-    #         else:
-    #             lst.append(role.id)
-    #             await member.add_roles(role)
+        action_value = action.value
+        if action_value == 'toggle':
+            action_value = 'remove' if role.id in persisted else 'add'
+        try:
+            if action_value == 'add':
+                await member.add_roles(role)
+                persisted.add(role.id)
+            else:
+                await member.remove_roles(role)
+                persisted.discard(role.id)
+        except discord.HTTPException as e:
+            return await reply(interaction, f"❌ Failed to update {role.name} for {member.mention}: {e}", ephemeral=True)
                 
-    #     self.data_handler.save_data(self.data)  # Save the updated data
-    #     await interaction.response.send_message(f"✅ {action_value.title()}ed {role.name} for {member.mention}")
+        self.role_snapshots.set_roles(gid, uid, persisted)
+        verb = 'Added' if action_value == 'add' else 'Removed'
+        await reply(interaction, f"✅ {verb} persistent role {role.name} for {member.mention}")
 
     # /announce command
     @app_commands.command(name="announce", description="Send an announcement with markdown formatting.")
@@ -389,14 +706,13 @@ class Moderation(commands.Cog):
         except ValueError:
             return await interaction.response.send_message("❌ Invalid duration format. Use like 1h, 30m, 2d", ephemeral=True)
             
-        self.data.setdefault('timed',[]).append({
+        self.schedule_timed({
             'type':'temprole',
             'user_id':member.id,
             'guild_id':interaction.guild.id,
             'role_id':role.id,
             'end':end
         })
-        self.data_handler.save_data(self.data)
         await member.add_roles(role)
         await interaction.response.send_message(f"🎭 {role.name} -> {member.mention} for {duration}")
 
@@ -426,10 +742,7 @@ class Moderation(commands.Cog):
             
         await member.add_roles(role)
         dm = self.config['mute_message'].format(duration=duration or "indefinitely", reason=reason)
-        try:
-            await member.send(dm)
-        except discord.Forbidden:
-            pass
+        await self.outbox.send(member, dm)
             
         await interaction.response.send_message(f"🔇 Muted {member.mention}")
         await self.log(interaction, "Mute", member, reason, duration)
@@ -437,13 +750,12 @@ class Moderation(commands.Cog):
         if duration:
             try:
                 end = datetime.datetime.utcnow().timestamp() + parse_time(duration)
-                self.data.setdefault('timed', []).append({
+                self.schedule_timed({
                     'type':'mute',
                     'user_id':member.id,
                     'guild_id':interaction.guild.id,
                     'end':end
                 })
-                self.data_handler.save_data(self.data)
             except ValueError:
                 pass
 
@@ -470,10 +782,7 @@ class Moderation(commands.Cog):
             
         await member.remove_roles(role)
         dm = self.config['unmute_message'].format(reason=reason)
-        try:
-            await member.send(dm)
-        except discord.Forbidden:
-            pass
+        await self.outbox.send(member, dm)
             
         await interaction.response.send_message(f"🔊 Unmuted {member.mention}")
         await self.log(interaction, "Unmute", member, reason)
@@ -495,21 +804,75 @@ class Moderation(commands.Cog):
             return
             
         gid, uid = str(interaction.guild.id), str(member.id)
-        self.data.setdefault('warnings',{}).setdefault(gid,{}).setdefault(uid,[]).append({
+        warning = {
             'reason':reason,
             'mod':interaction.user.id,
             'time':datetime.datetime.utcnow().isoformat()
-        })
+        }
+        self.data.setdefault('warnings',{}).setdefault(gid,{}).setdefault(uid,[]).append(warning)
         self.data_handler.save_data(self.data)
+        self._index_entry(gid, 'warning', member.id, warning)
         
         dm = self.config['warn_message'].format(reason=reason)
-        try:
-            await member.send(dm)
-        except discord.Forbidden:
-            pass
+        await self.outbox.send(member, dm)
             
         await interaction.response.send_message(f"⚠️ Warned {member.mention}")
         await self.log(interaction, "Warn", member, reason)
+        await self._escalate(interaction, member, warning)
+
+    @staticmethod
+    def _warning_ts(warning):
+        return datetime.datetime.fromisoformat(warning['time']).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    async def _escalate(self, interaction, member, warning):
+        """Apply the escalation rule this warning completes, if any."""
+        gid = str(interaction.guild.id)
+        earlier = lambda: [self._warning_ts(w) for w in self.data['warnings'][gid][str(member.id)] if w is not warning]
+        rule = self.escalation.record(gid, member.id, self._warning_ts(warning), seed=earlier)
+        if rule is None:
+            return
+        self.data_handler.save_data(self.data)  # persist the fire time in escalation_fired
+
+        guild = interaction.guild
+        action, duration = rule['action'].lower(), rule.get('duration')
+        reason = f"Automatic: {rule['count']} warnings within {rule['window_text']}"
+        try:
+            if action == 'mute':
+                role = guild.get_role(self.config.get('mute_role'))
+                if not role:
+                    print("[Moderation] Escalation wants a mute but no mute role is configured")
+                    return
+                await member.add_roles(role, reason=reason)
+                await self.outbox.send(member, self.config['mute_message'].format(duration=duration or "indefinitely", reason=reason))
+            elif action in ('kick', 'ban'):
+                text = (self.config['kick_message'].format(reason=reason) if action == 'kick'
+                        else self.config['ban_message'].format(duration=duration or "permanently", reason=reason))
+                await self.outbox.send_now(member, text, DM_BEFORE_REMOVAL_TIMEOUT)
+                if action == 'kick':
+                    await member.kick(reason=reason)
+                else:
+                    await member.ban(reason=reason)
+            else:
+                print(f"[Moderation] Unknown escalation action {rule['action']}")
+                return
+        except discord.HTTPException as e:
+            print(f"[Moderation] Escalation {action} failed for {member.id}: {e}")
+            return
+
+        case = self._new_case(guild, self.bot.user, action.title(), member, reason, duration)
+        self._store_cases(gid, [case])
+        if duration and action in ('mute', 'ban'):
+            self.schedule_timed({
+                'type': action,
+                'user_id': member.id,
+                'guild_id': guild.id,
+                'end': datetime.datetime.utcnow().timestamp() + parse_time(duration)
+            })
+        await self._send_modlog(guild, self._case_embed(case, self.bot.user))
+        await interaction.followup.send(
+            f"⏫ {member.mention} reached {rule['count']} warnings within {rule['window_text']}: "
+            f"{action}{f' for {duration}' if duration else ''} (case #{case['case_id']})"
+        )
 
     @app_commands.command(name="warnings", description="View warnings for a member")
     @app_commands.describe(member="Member to view warnings for")
@@ -552,8 +915,10 @@ class Moderation(commands.Cog):
         uw = gw.get(str(member.id),[])
         
         if 1 <= index <= len(uw):
-            uw.pop(index-1)
+            removed = uw.pop(index-1)
             self.data_handler.save_data(self.data)
+            self.escalation.forget(str(interaction.guild.id), member.id)
+            self._unindex_entry(str(interaction.guild.id), 'warning', removed)
             await interaction.response.send_message(f"🗑️ Deleted warning #{index}")
         else:
             await interaction.response.send_message("❌ Warning not found.", ephemeral=True)
@@ -571,12 +936,14 @@ class Moderation(commands.Cog):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
         gid, uid = str(interaction.guild.id), str(member.id)
-        self.data.setdefault('notes',{}).setdefault(gid,{}).setdefault(uid,[]).append({
+        note = {
             'note':text,
             'mod':interaction.user.id,
             'time':datetime.datetime.utcnow().isoformat()
-        })
+        }
+        self.data.setdefault('notes',{}).setdefault(gid,{}).setdefault(uid,[]).append(note)
         self.data_handler.save_data(self.data)
+        self._index_entry(gid, 'note', member.id, note)
         await interaction.response.send_message(f"📝 Note added for {member.mention}")
 
     @app_commands.command(name="notes", description="View notes for a member")
@@ -618,6 +985,7 @@ class Moderation(commands.Cog):
         if 1 <= index <= len(ns):
             ns[index-1]['note'] = text
             self.data_handler.save_data(self.data)
+            self._index_entry(str(interaction.guild.id), 'note', member.id, ns[index-1])
             await interaction.response.send_message(f"✏️ Edited note #{index}")
         else:
             await interaction.response.send_message("❌ Note not found.", ephemeral=True)
@@ -636,8 +1004,9 @@ class Moderation(commands.Cog):
             
         ns = self.data.get('notes',{}).get(str(interaction.guild.id),{}).get(str(member.id),[])
         if 1 <= index <= len(ns):
-            ns.pop(index-1)
+            removed = ns.pop(index-1)
             self.data_handler.save_data(self.data)
+            self._unindex_entry(str(interaction.guild.id), 'note', removed)
             await interaction.response.send_message(f"🗑️ Deleted note #{index}")
         else:
             await interaction.response.send_message("❌ Note not found.", ephemeral=True)
@@ -649,8 +1018,10 @@ class Moderation(commands.Cog):
         if not await self.check_command_permissions(interaction, 'clearnotes'):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
-        self.data.get('notes',{}).get(str(interaction.guild.id),{}).pop(str(member.id), None)
+        removed = self.data.get('notes',{}).get(str(interaction.guild.id),{}).pop(str(member.id), None)
         self.data_handler.save_data(self.data)
+        for note in removed or []:
+            self._unindex_entry(str(interaction.guild.id), 'note', note)
         await interaction.response.send_message(f"🗑️ Cleared all notes for {member.mention}")
 
     @app_commands.command(name="modlogs", description="View moderation logs for a member")
@@ -658,15 +1029,15 @@ class Moderation(commands.Cog):
         member="Member to view logs for",
         page="Page number (default 1)"
     )
+    @auto_defer()
     async def modlogs(self, interaction: discord.Interaction, 
                      member: discord.Member, 
                      page: int = 1):
         """Get a list of moderation logs for a user."""
         if not await self.check_command_permissions(interaction, 'modlogs'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
             
-        logs = self.data.get('modlogs', {}).get(str(interaction.guild.id), [])
-        user_logs = [l for l in logs if l['user_id']==member.id]
+        user_logs = self.modlogs.for_user(str(interaction.guild.id), member.id)
         start, end = (page-1)*5, page*5
         
         embed = discord.Embed(title=f"Modlogs for {member}", color=discord.Color.blue())
@@ -676,38 +1047,38 @@ class Moderation(commands.Cog):
                 value=f"Reason: {l['reason'] or 'None'}\nTime: {l['timestamp']}",
                 inline=False
             )
-        await interaction.response.send_message(embed=embed)
+        await reply(interaction, embed=embed)
 
     @app_commands.command(name="case", description="View details of a specific case")
     @app_commands.describe(case_id="Case ID to view")
+    @auto_defer()
     async def case(self, interaction: discord.Interaction, case_id: int):
         """Show a single mod log case."""
         if not await self.check_command_permissions(interaction, 'case'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
             
-        logs = self.data.get('modlogs', {}).get(str(interaction.guild.id), [])
-        for l in logs:
-            if l['case_id']==case_id:
-                u = interaction.guild.get_member(l['user_id']) or l['user_id']
-                m = interaction.guild.get_member(l['moderator_id']) or l['moderator_id']
-                
-                embed = discord.Embed(title=f"Case #{case_id}", color=discord.Color.purple())
-                embed.add_field(name="Action", value=l['action'], inline=True)
-                embed.add_field(name="User", value=u, inline=True)
-                embed.add_field(name="Moderator", value=m, inline=True)
-                embed.add_field(name="Reason", value=l['reason'] or "None", inline=False)
-                
-                if l['duration']:
-                    try:
-                        secs = parse_time(l['duration'])
-                        ts = int((datetime.datetime.utcnow()+datetime.timedelta(seconds=secs)).timestamp())
-                        embed.add_field(name="Until", value=f"<t:{ts}:R> (<t:{ts}:F>)", inline=True)
-                    except ValueError:
-                        pass
-                        
-                return await interaction.response.send_message(embed=embed)
+        l = self.modlogs.get(str(interaction.guild.id), case_id)
+        if l is None:
+            return await reply(interaction, "❌ Case not found.", ephemeral=True)
+
+        u = interaction.guild.get_member(l['user_id']) or l['user_id']
+        m = interaction.guild.get_member(l['moderator_id']) or l['moderator_id']
+        
+        embed = discord.Embed(title=f"Case #{case_id}", color=discord.Color.purple())
+        embed.add_field(name="Action", value=l['action'], inline=True)
+        embed.add_field(name="User", value=u, inline=True)
+        embed.add_field(name="Moderator", value=m, inline=True)
+        embed.add_field(name="Reason", value=l['reason'] or "None", inline=False)
+        
+        if l['duration']:
+            try:
+                secs = parse_time(l['duration'])
+                ts = int((datetime.datetime.utcnow()+datetime.timedelta(seconds=secs)).timestamp())
+                embed.add_field(name="Until", value=f"<t:{ts}:R> (<t:{ts}:F>)", inline=True)
+            except ValueError:
+                pass
                 
-        await interaction.response.send_message("❌ Case not found.", ephemeral=True)
+        await reply(interaction, embed=embed)
 
     @app_commands.command(name="ignored", description="List ignored users, roles, and channels")
     async def ignored(self, interaction: discord.Interaction):
@@ -733,14 +1104,150 @@ class Moderation(commands.Cog):
         if not await self.check_command_permissions(interaction, 'reason'):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
-        logs = self.data.get('modlogs', {}).get(str(interaction.guild.id), [])
-        for l in logs:
-            if l['case_id']==case_id:
-                l['reason'] = reason
-                self.data_handler.save_data(self.data)
-                return await interaction.response.send_message(f"✅ Updated reason for case {case_id}.")
-                
-        await interaction.response.send_message("❌ Case not found.", ephemeral=True)
+        l = self.modlogs.get(str(interaction.guild.id), case_id)
+        if l is None:
+            return await interaction.response.send_message("❌ Case not found.", ephemeral=True)
+
+        self.modlogs.amend(str(interaction.guild.id), case_id, reason=reason)
+        self._index_case(str(interaction.guild.id), l)
+        await interaction.response.send_message(f"✅ Updated reason for case {case_id}.")
+
+    @app_commands.command(name="modsearch", description="Search case reasons, warnings and notes")
+    @app_commands.describe(
+        query="Words to search for",
+        kind="Only search this kind of entry",
+        action="Only cases with this action (e.g. Ban, Mute)",
+        moderator="Only entries by this moderator",
+        after="Only entries on or after this date (YYYY-MM-DD)",
+        before="Only entries before this date (YYYY-MM-DD)",
+        page="Page number (default 1)"
+    )
+    @app_commands.choices(kind=[
+        app_commands.Choice(name="cases", value="case"),
+        app_commands.Choice(name="warnings", value="warning"),
+        app_commands.Choice(name="notes", value="note"),
+    ])
+    @auto_defer()
+    async def modsearch(self, interaction: discord.Interaction, query: str,
+                        kind: app_commands.Choice[str] = None, action: str = None,
+                        moderator: discord.Member = None, after: str = None, before: str = None,
+                        page: int = 1):
+        """Ranked full-text search over the guild's moderation history."""
+        if not await self.check_command_permissions(interaction, 'modsearch'):
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
+
+        try:
+            for day in (after, before):
+                if day:
+                    datetime.date.fromisoformat(day)
+        except ValueError:
+            return await reply(interaction, "❌ Dates must look like 2024-01-31.", ephemeral=True)
+
+        def accept(doc):
+            if kind and doc['kind'] != kind.value:
+                return False
+            if action and (doc['kind'] != 'case' or doc['action'].lower() != action.lower()):
+                return False
+            if moderator and doc['moderator_id'] != moderator.id:
+                return False
+            # ISO timestamps compare correctly as strings
+            if after and (doc['time'] or '') < after:
+                return False
+            if before and (doc['time'] or '') >= before:
+                return False
+            return True
+
+        results = (await self._search_index(str(interaction.guild.id))).search(query, accept)
+        pages = max(1, -(-len(results) // MODSEARCH_PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * MODSEARCH_PAGE_SIZE
+
+        embed = discord.Embed(title=f"Search: {query[:200]}", color=discord.Color.blue())
+        for _, doc in results[start:start + MODSEARCH_PAGE_SIZE]:
+            if doc['kind'] == 'case':
+                name = f"Case #{doc['case_id']} – {doc['action']}"
+            else:
+                name = doc['kind'].title()
+            target = f"<@{doc['user_id']}>" if doc['user_id'] else "Server-wide"
+            text = doc['text'] if len(doc['text']) <= 300 else doc['text'][:297] + "..."
+            embed.add_field(
+                name=name,
+                value=f"{target} by <@{doc['moderator_id']}> • {(doc['time'] or '?')[:10]}\n{text or 'None'}",
+                inline=False
+            )
+        if not results:
+            embed.description = "No matches."
+        embed.set_footer(text=f"{len(results)} results • page {page}/{pages}")
+        await reply(interaction, embed=embed)
+
+    async def _build_search_indexes(self):
+        """Index every guild's cases, warnings and notes in a worker thread."""
+        # Warnings and notes are listed here on the event loop; only the segment
+        # reads and tokenizing happen in the thread
+        entries = {}
+        for kind, section in (('warning', 'warnings'), ('note', 'notes')):
+            for gid, users in self.data.get(section, {}).items():
+                for uid, items in users.items():
+                    entries.setdefault(gid, []).extend((kind, int(uid), entry) for entry in items)
+        gids = set(entries) | set(self.modlogs.guild_ids())
+
+        def build():
+            indexes = {}
+            for gid in gids:
+                index = indexes[gid] = SearchIndex()
+                for case in self.modlogs.read_cases(gid):
+                    self._add_case(index, case)
+                for kind, uid, entry in entries.get(gid, []):
+                    self._add_entry(index, kind, uid, entry)
+            return indexes
+
+        try:
+            self.search_indexes = await asyncio.to_thread(build)
+        except Exception as e:
+            print(f"[Moderation] Failed to build search indexes: {e}")
+        finally:
+            pending, self._search_pending = self._search_pending, None
+        for update in pending:
+            update()
+        print(f"[Moderation] Search indexes ready for {len(self.search_indexes)} guilds")
+
+    async def _search_index(self, gid):
+        """The guild's search index, waiting for the startup build if it is still running."""
+        if self._search_build is not None and not self._search_build.done():
+            await asyncio.shield(self._search_build)
+        return self.search_indexes.setdefault(gid, SearchIndex())
+
+    @staticmethod
+    def _add_case(index, case):
+        index.add(('case', case['case_id']), case.get('reason'), kind='case', case_id=case['case_id'],
+                  action=case['action'], user_id=case.get('user_id'),
+                  moderator_id=case['moderator_id'], time=case.get('timestamp'))
+
+    @staticmethod
+    def _add_entry(index, kind, user_id, entry):
+        # Warnings and notes have no ID of their own; the stored dict's identity is stable while loaded
+        index.add((kind, id(entry)), entry['reason'] if kind == 'warning' else entry['note'], kind=kind,
+                  user_id=user_id, moderator_id=entry['mod'], time=entry.get('time'))
+
+    def _index_case(self, gid, case):
+        if self._search_pending is not None:
+            self._search_pending.append(lambda: self._index_case(gid, case))
+            return
+        self._add_case(self.search_indexes.setdefault(gid, SearchIndex()), case)
+
+    def _index_entry(self, gid, kind, user_id, entry):
+        if self._search_pending is not None:
+            self._search_pending.append(lambda: self._index_entry(gid, kind, user_id, entry))
+            return
+        self._add_entry(self.search_indexes.setdefault(gid, SearchIndex()), kind, user_id, entry)
+
+    def _unindex_entry(self, gid, kind, entry):
+        if self._search_pending is not None:
+            self._search_pending.append(lambda: self._unindex_entry(gid, kind, entry))
+            return
+        index = self.search_indexes.get(gid)
+        if index is not None:
+            index.remove((kind, id(entry)))
 
     ########################
     # Lock Channel Command #
@@ -762,7 +1269,8 @@ class Moderation(commands.Cog):
             return await interaction.response.send_message("❌ Channel is already locked or uneditable.", ephemeral=True)
 
         await ch.set_permissions(interaction.guild.default_role, overwrite=discord.PermissionOverwrite(send_messages=False))
-        self.data.setdefault('locked_channels', set()).add(ch.id)
+        self.data['locked_channels'].add(ch.id)
+        self.data_handler.save_data(self.data)
         if message:
             await ch.send(message)
 
@@ -771,13 +1279,12 @@ class Moderation(commands.Cog):
         if duration:
             try:
                 end = datetime.datetime.utcnow().timestamp() + parse_time(duration)
-                self.data.setdefault('timed', []).append({
+                self.schedule_timed({
                     'type': 'unlock_ch',
                     'guild_id': interaction.guild.id,
                     'channel_id': ch.id,
                     'end': end
                 })
-                self.data_handler.save_data(self.data)
             except ValueError:
                 await interaction.followup.send("⚠️ Invalid duration format.")
 
@@ -792,7 +1299,7 @@ class Moderation(commands.Cog):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
 
         ch = channel or interaction.channel
-        locked = self.data.get("locked_channels", set())
+        locked = self.data['locked_channels']
 
         if ch.id not in locked:
             return await interaction.response.send_message("❌ Channel is not locked by the bot.", ephemeral=True)
@@ -812,52 +1319,329 @@ class Moderation(commands.Cog):
     lockdown = app_commands.Group(name="lockdown", description="Server lockdown controls")
 
     @lockdown.command(name="start", description="Lock all text channels (except excluded)")
+    @auto_defer()
     async def lockdown_start(self, interaction: discord.Interaction, message: str = None):
         if not await self.check_command_permissions(interaction, 'lockdown'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
 
-        locked = []
+        await defer(interaction)
+        done, failed = await self._run_with_progress(interaction, "🔒 Locking channels", True, message)
+        result = f"🔒 Server lockdown started. Locked {done} channels."
+        if failed:
+            result += f" ⚠️ {failed} could not be locked."
+        await interaction.edit_original_response(content=result)
+
+    @lockdown.command(name="end", description="End server lockdown and unlock affected channels")
+    @auto_defer()
+    async def lockdown_end(self, interaction: discord.Interaction, message: str = None):
+        if not await self.check_command_permissions(interaction, 'lockdown'):
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
+
+        await defer(interaction)
+        done, failed = await self._run_with_progress(interaction, "🔓 Unlocking channels", False, message)
+        result = f"🔓 Lockdown ended. Unlocked {done} channels."
+        if failed:
+            result += f" ⚠️ {failed} could not be unlocked, run /lockdown end again to retry."
+        await interaction.edit_original_response(content=result)
+
+    async def _run_with_progress(self, interaction, label, locking, message):
+        """Run a guild lockdown change, editing the deferred response with progress."""
+        progress = {'done': 0, 'failed': 0, 'total': 0}
+        await interaction.edit_original_response(content=f"{label}…")
+
+        async def report():
+            while True:
+                await asyncio.sleep(LOCKDOWN_PROGRESS_INTERVAL)
+                try:
+                    await interaction.edit_original_response(
+                        content=f"{label}… {progress['done'] + progress['failed']}/{progress['total']}"
+                    )
+                except discord.HTTPException:
+                    pass
+
+        reporter = asyncio.create_task(report())
+        try:
+            if locking:
+                return await self.lock_guild(interaction.guild, message, progress)
+            return await self.unlock_guild(interaction.guild, message, progress)
+        finally:
+            reporter.cancel()
+
+    def _lockdown_targets(self, guild):
         excluded_ch = set(self.config.get("lockdown_channels_exclude", []))
         excluded_cat = set(self.config.get("lockdown_categories_exclude", []))
-
-        for ch in interaction.guild.text_channels:
+        targets = []
+        for ch in guild.text_channels:
             if ch.id in excluded_ch or (ch.category_id and ch.category_id in excluded_cat):
                 continue
+            if ch.permissions_for(guild.default_role).send_messages:
+                targets.append(ch)
+        return targets
+
+    async def lock_guild(self, guild, message=None, progress=None):
+        """Lock every non-excluded text channel. Returns (locked, failed)."""
+        return await self._set_channels_locked(guild, self._lockdown_targets(guild), True, message, progress)
+
+    async def unlock_guild(self, guild, message=None, progress=None):
+        """Unlock every channel the bot has locked. Returns (unlocked, failed)."""
+        channels = []
+        for ch_id in list(self.data['locked_channels']):
+            ch = guild.get_channel(ch_id)
+            if ch:
+                channels.append(ch)
+            else:
+                self.data['locked_channels'].discard(ch_id)  # deleted since
+        return await self._set_channels_locked(guild, channels, False, message, progress)
+
+    async def _set_channels_locked(self, guild, channels, locking, message, progress):
+        # locked_channels is saved as channels complete, and lockdown_state marks
+        # the run as in progress, so after a crash the set reflects what was
+        # really changed and either command can pick up from there
+        progress = progress if progress is not None else {'done': 0, 'failed': 0}
+        progress['total'] = len(channels)
+        locked = self.data['locked_channels']
+        self.data['lockdown_state'] = 'locking' if locking else 'unlocking'
+        self.data_handler.save_data(self.data)
+
+        loop = asyncio.get_running_loop()
+        overwrite_limit = asyncio.Semaphore(self.config.get('lockdown_concurrency', 5))
+        send_limit = asyncio.Semaphore(self.config.get('lockdown_send_concurrency', 2))
+        last_save = loop.time()
+
+        async def apply(ch):
+            nonlocal last_save
+            try:
+                async with overwrite_limit:
+                    await ch.set_permissions(guild.default_role, overwrite=discord.PermissionOverwrite(send_messages=not locking))
+            except discord.HTTPException as e:
+                progress['failed'] += 1
+                print(f"[Moderation] Failed to {'lock' if locking else 'unlock'} #{ch.name}: {e}")
+                return
+
+            if locking:
+                locked.add(ch.id)
+            else:
+                locked.discard(ch.id)
+            progress['done'] += 1
+            if loop.time() - last_save >= LOCKDOWN_SAVE_INTERVAL:
+                last_save = loop.time()
+                self.data_handler.save_data(self.data)
 
-            perms = ch.permissions_for(interaction.guild.default_role)
-            if perms.send_messages:
-                await ch.set_permissions(interaction.guild.default_role, overwrite=discord.PermissionOverwrite(send_messages=False))
-                locked.append(ch.id)
-                if message:
-                    await ch.send(message)
+            if message:
+                try:
+                    async with send_limit:
+                        await ch.send(message)
+                except discord.HTTPException:
+                    pass
 
-        self.data["lockdown_active"] = True
-        self.data["locked_channels"] = set(locked)
+        await asyncio.gather(*(apply(ch) for ch in channels))
+
+        self.data['lockdown_active'] = locking or bool(locked)
+        self.data['lockdown_state'] = None
         self.data_handler.save_data(self.data)
+        return progress['done'], progress['failed']
 
-        await interaction.response.send_message(f"🔒 Server lockdown started. Locked {len(locked)} channels.")
+    ################################
+    # Mass Actions (/mass ...)     #
+    ################################
+    mass = app_commands.Group(name="mass", description="Bulk moderation actions")
 
-    @lockdown.command(name="end", description="End server lockdown and unlock affected channels")
-    async def lockdown_end(self, interaction: discord.Interaction, message: str = None):
-        if not await self.check_command_permissions(interaction, 'lockdown'):
-            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+    @mass.command(name="ban", description="Ban many members at once")
+    @app_commands.describe(
+        users="User IDs or mentions, separated by spaces",
+        from_role="Everyone with this role",
+        joined_within="Members who joined within this time (e.g. 30m)",
+        duration="Duration of ban (e.g. 1d, 2h)",
+        reason="Reason for ban"
+    )
+    async def mass_ban(self, interaction: discord.Interaction, users: str = None, from_role: discord.Role = None,
+                       joined_within: str = None, duration: str = None, reason: str = "No reason provided"):
+        await self._mass_action(interaction, 'ban', users, from_role, joined_within, reason, duration)
 
-        locked_ids = self.data.get("locked_channels", set())
-        unlocked = 0
+    @mass.command(name="kick", description="Kick many members at once")
+    @app_commands.describe(
+        users="User IDs or mentions, separated by spaces",
+        from_role="Everyone with this role",
+        joined_within="Members who joined within this time (e.g. 30m)",
+        reason="Reason for kick"
+    )
+    async def mass_kick(self, interaction: discord.Interaction, users: str = None, from_role: discord.Role = None,
+                        joined_within: str = None, reason: str = "No reason provided"):
+        await self._mass_action(interaction, 'kick', users, from_role, joined_within, reason)
 
-        for ch_id in locked_ids.copy():
-            ch = interaction.guild.get_channel(ch_id)
-            if ch:
-                await ch.set_permissions(interaction.guild.default_role, overwrite=discord.PermissionOverwrite(send_messages=True))
-                if message:
-                    await ch.send(message)
-                unlocked += 1
+    @mass.command(name="mute", description="Mute many members at once")
+    @app_commands.describe(
+        users="User IDs or mentions, separated by spaces",
+        from_role="Everyone with this role",
+        joined_within="Members who joined within this time (e.g. 30m)",
+        duration="Duration of mute (e.g. 1h, 2d)",
+        reason="Reason for mute"
+    )
+    async def mass_mute(self, interaction: discord.Interaction, users: str = None, from_role: discord.Role = None,
+                        joined_within: str = None, duration: str = None, reason: str = "No reason provided"):
+        await self._mass_action(interaction, 'mute', users, from_role, joined_within, reason, duration)
 
-        self.data["locked_channels"] = set()
-        self.data["lockdown_active"] = False
-        self.data_handler.save_data(self.data)
+    @mass.command(name="temprole", description="Assign a temporary role to many members at once")
+    @app_commands.describe(
+        role="Role to assign",
+        duration="Duration (e.g. 1h, 2d)",
+        users="User IDs or mentions, separated by spaces",
+        from_role="Everyone with this role",
+        joined_within="Members who joined within this time (e.g. 30m)"
+    )
+    async def mass_temprole(self, interaction: discord.Interaction, role: discord.Role, duration: str,
+                            users: str = None, from_role: discord.Role = None, joined_within: str = None):
+        await self._mass_action(interaction, 'temprole', users, from_role, joined_within, None, duration, role)
+
+    def _resolve_mass_targets(self, interaction, users, from_role, joined_within, allow_absent):
+        """Union of the ID list, role members and recent joiners, minus members the moderator can't act on."""
+        guild = interaction.guild
+        found = {}
+        for part in (users or '').replace(',', ' ').split():
+            try:
+                uid = int(part.strip('<@!>'))
+            except ValueError:
+                continue
+            member = guild.get_member(uid)
+            if member:
+                found[uid] = member
+            elif allow_absent:
+                found[uid] = discord.Object(id=uid)  # bans work for users who already left
+        if from_role:
+            for uid in self.role_index.members_of(guild, from_role.id):
+                member = guild.get_member(uid)
+                if member:
+                    found[uid] = member
+        if joined_within:
+            cutoff = discord.utils.utcnow() - datetime.timedelta(seconds=joined_within)
+            for member in guild.members:
+                if member.joined_at and member.joined_at >= cutoff:
+                    found[member.id] = member
+
+        targets, skipped = [], 0
+        for uid, target in found.items():
+            if uid in (interaction.user.id, self.bot.user.id):
+                skipped += 1
+            elif isinstance(target, discord.Member) and interaction.user.top_role <= target.top_role:
+                skipped += 1
+            else:
+                targets.append(target)
+        return targets, skipped
+
+    @auto_defer()
+    async def _mass_action(self, interaction, kind, users, from_role, joined_within, reason, duration=None, role=None):
+        if not await self.check_command_permissions(interaction, f'mass_{kind}'):
+            return await reply(interaction, "❌ No permission.", ephemeral=True)
+        if not (users or from_role or joined_within):
+            return await reply(interaction, "❌ Give users, a role or joined_within to pick targets.", ephemeral=True)
+        try:
+            within = parse_time(joined_within) if joined_within else None
+            seconds = parse_time(duration) if duration else None
+        except ValueError:
+            return await reply(interaction, "❌ Invalid duration format. Use like 1h, 30m, 2d", ephemeral=True)
+
+        guild = interaction.guild
+        if kind == 'mute':
+            role = guild.get_role(self.config.get('mute_role'))
+            if not role:
+                return await reply(interaction, "❌ Mute role not configured.", ephemeral=True)
+
+        await defer(interaction)
+        targets, skipped = self._resolve_mass_targets(interaction, users, from_role, within, allow_absent=(kind == 'ban'))
+        limit = self.config.get('mass_max_targets', 250)
+        if not targets:
+            return await interaction.followup.send(f"❌ No targets matched ({skipped} skipped).")
+        if len(targets) > limit:
+            return await interaction.followup.send(
+                f"❌ {len(targets)} targets matched, more than the limit of {limit}. Narrow the selection."
+            )
+
+        if kind == 'ban':
+            dm_text = self.config['ban_message'].format(duration=duration or "permanently", reason=reason)
+        elif kind == 'kick':
+            dm_text = self.config['kick_message'].format(reason=reason)
+        elif kind == 'mute':
+            dm_text = self.config['mute_message'].format(duration=duration or "indefinitely", reason=reason)
+        else:
+            dm_text = None
 
-        await interaction.response.send_message(f"🔓 Lockdown ended. Unlocked {unlocked} channels.")
+        semaphore = asyncio.Semaphore(self.config.get('mass_concurrency', 5))
+        done, failed = [], []
+
+        async def apply(target):
+            async with semaphore:
+                try:
+                    is_member = isinstance(target, discord.Member)
+                    if kind in ('ban', 'kick'):
+                        if is_member:
+                            await self.outbox.send_now(target, dm_text, DM_BEFORE_REMOVAL_TIMEOUT)
+                        if kind == 'ban':
+                            await guild.ban(target, reason=reason)
+                        else:
+                            await target.kick(reason=reason)
+                    else:
+                        await target.add_roles(role, reason=reason)
+                        if dm_text:
+                            await self.outbox.send(target, dm_text)
+                    done.append(target)
+                except discord.HTTPException as e:
+                    print(f"[Moderation] Mass {kind} failed for {target.id}: {e}")
+                    failed.append(target)
+
+        await asyncio.gather(*(apply(t) for t in targets))
+
+        # One append for every case and one save for every timed action
+        action = kind.title()
+        gid = str(guild.id)
+        cases = []
+        if kind != 'temprole':
+            cases = [self._new_case(guild, interaction.user, action, t, reason, duration) for t in done]
+            self._store_cases(gid, cases)
+        if seconds and kind in ('ban', 'mute', 'temprole'):
+            end = datetime.datetime.utcnow().timestamp() + seconds
+            actions = []
+            for t in done:
+                timed = {'type': kind, 'user_id': t.id, 'guild_id': guild.id, 'end': end}
+                if kind == 'temprole':
+                    timed['role_id'] = role.id
+                actions.append(timed)
+            self.schedule_timed_many(actions)
+
+        if done:
+            await self._send_modlog(guild, self._mass_embed(interaction.user, action, done, failed, cases, reason, duration, role))
+
+        summary = f"✅ Mass {kind}: {len(done)} done"
+        if failed:
+            summary += f", {len(failed)} failed"
+        if skipped:
+            summary += f", {skipped} skipped (yourself, the bot or members ranked at or above you)"
+        await interaction.followup.send(summary + ".")
+
+    def _mass_embed(self, moderator, action, done, failed, cases, reason, duration, role):
+        embed = discord.Embed(
+            title=f"Moderation Log: Mass {action}",
+            description=f"Action: {action}" + (f" {role.mention}" if action == 'Temprole' else "") + f" × {len(done)}",
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        embed.add_field(name="Moderator", value=moderator.mention, inline=False)
+        if cases:
+            embed.add_field(name="Cases", value=f"#{cases[0]['case_id']} – #{cases[-1]['case_id']}", inline=False)
+
+        mentions, shown = [], 0
+        for target in done:
+            mention = f"<@{target.id}>"
+            if shown + len(mention) + 2 > 1000:
+                mentions.append(f"… and {len(done) - len(mentions)} more")
+                break
+            mentions.append(mention)
+            shown += len(mention) + 2
+        embed.add_field(name="Targets", value=", ".join(mentions), inline=False)
+        if failed:
+            embed.add_field(name="Failed", value=str(len(failed)), inline=False)
+        embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
+        embed.add_field(name="Duration", value=duration or "N/A", inline=False)
+        return embed
 
     @app_commands.command(name="moderations", description="View active moderations for a member")
     @app_commands.describe(
@@ -871,7 +1655,7 @@ class Moderation(commands.Cog):
         if not await self.check_command_permissions(interaction, 'moderations'):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
-        act = [t for t in self.data.get('timed',[]) if t['user_id']==member.id]
+        act = [t for t in self.data.get('timed',[]) if t.get('user_id')==member.id]
         pag = act[(page-1)*5:page*5]
         
         embed = discord.Embed(title=f"Active moderations for {member}", color=discord.Color.green())
@@ -894,8 +1678,7 @@ class Moderation(commands.Cog):
         if not await self.check_command_permissions(interaction, 'modstats'):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
-        logs = self.data.get('modlogs', {}).get(str(interaction.guild.id), [])
-        user_actions = [l for l in logs if l['moderator_id'] == member.id]
+        user_actions = self.modlogs.for_moderator(str(interaction.guild.id), member.id)
         
         if not user_actions:
             return await interaction.response.send_message(f"📊 No moderation actions found for {member.mention}")
@@ -928,29 +1711,29 @@ class Moderation(commands.Cog):
         if not await self.check_command_permissions(interaction, 'duration'):
             return await interaction.response.send_message("❌ No permission.", ephemeral=True)
             
-        logs = self.data.get('modlogs', {}).get(str(interaction.guild.id), [])
-        for l in logs:
-            if l['case_id'] == case_id and l['duration'] is not None:
-                try:
-                    new_duration = parse_time(limit)
-                    l['duration'] = limit
-                    
-                    # Update timed action
-                    for t in self.data.get('timed', []):
-                        if t['user_id'] == l['user_id'] and t['type'].lower() == l['action'].lower():
-                            t['end'] = datetime.datetime.utcnow().timestamp() + new_duration
-                            
-                    self.data_handler.save_data(self.data)
-                    return await interaction.response.send_message(
-                        f"✅ Updated duration for case {case_id} to {limit}"
-                    )
-                except ValueError:
-                    return await interaction.response.send_message(
-                        "❌ Invalid duration format. Use like 1h, 30m, 2d",
-                        ephemeral=True
-                    )
-                    
-        await interaction.response.send_message("❌ Case not found or not timed.", ephemeral=True)
+        l = self.modlogs.get(str(interaction.guild.id), case_id)
+        if l is None or l['duration'] is None:
+            return await interaction.response.send_message("❌ Case not found or not timed.", ephemeral=True)
+
+        try:
+            new_duration = parse_time(limit)
+        except ValueError:
+            return await interaction.response.send_message(
+                "❌ Invalid duration format. Use like 1h, 30m, 2d",
+                ephemeral=True
+            )
+        self.modlogs.amend(str(interaction.guild.id), case_id, duration=limit)
+        
+        # Update timed action
+        for t in self.data.get('timed', []):
+            if t.get('user_id') == l['user_id'] and t['type'].lower() == l['action'].lower():
+                t['end'] = datetime.datetime.utcnow().timestamp() + new_duration
+                self.reschedule_timed(t)
+                
+        self.data_handler.save_data(self.data)
+        await interaction.response.send_message(
+            f"✅ Updated duration for case {case_id} to {limit}"
+        )
 
     @app_commands.command(name="fireboard", description="View fireboard stats for a message")
     @app_commands.describe(link="Message link to check")
@@ -986,15 +1769,50 @@ class Moderation(commands.Cog):
         except (IndexError, ValueError, discord.NotFound, discord.Forbidden):
             await interaction.response.send_message("❌ Invalid message link or unable to fetch message.", ephemeral=True)
 
+    async def auto_mute(self, member, duration, reason):
+        """Mute a member on the bot's own authority (e.g. anti-spam). Returns the case, or None if nothing was done."""
+        guild = member.guild
+        role = guild.get_role(self.config.get('mute_role'))
+        if not role:
+            print("[Moderation] Can't auto-mute, no mute role is configured")
+            return None
+        if role in member.roles:
+            return None
+        try:
+            await member.add_roles(role, reason=reason)
+        except discord.HTTPException as e:
+            print(f"[Moderation] Auto-mute failed for {member.id}: {e}")
+            return None
+        await self.outbox.send(member, self.config['mute_message'].format(duration=duration or "indefinitely", reason=reason))
+
+        case = self._new_case(guild, self.bot.user, "Mute", member, reason, duration)
+        self._store_cases(str(guild.id), [case])
+        if duration:
+            self.schedule_timed({
+                'type': 'mute',
+                'user_id': member.id,
+                'guild_id': guild.id,
+                'end': datetime.datetime.utcnow().timestamp() + parse_time(duration)
+            })
+        await self._send_modlog(guild, self._case_embed(case, self.bot.user))
+        return case
+
     async def log(self, interaction: discord.Interaction, action: str, target, reason: str = None, duration: str = None):
         """Log a moderation action to the modlogs and send an embed to the specified log channel."""
-        gid = str(interaction.guild.id)
-        logs = self.data.setdefault('modlogs', {}).setdefault(gid, [])
-        case_id = len(logs) + 1
-
-        if isinstance(target, discord.Member):
-            user_id = target.id
-        elif isinstance(target, discord.Object):
+        case = self._new_case(interaction.guild, interaction.user, action, target, reason, duration)
+        self._store_cases(str(interaction.guild.id), [case])
+        await self._send_modlog(interaction.guild, self._case_embed(case, interaction.user))
+        return case['case_id']
+
+    def _store_cases(self, gid, cases):
+        """Append cases to the modlog in one write and add them to the search index."""
+        self.modlogs.append_many(gid, cases)
+        for case in cases:
+            self._index_case(gid, case)
+
+    def _new_case(self, guild, moderator, action, target, reason=None, duration=None):
+        """Build a case record with a freshly allocated case ID. The caller stores it."""
+        if isinstance(target, (discord.Member, discord.User, discord.Object)):
             user_id = target.id
         elif isinstance(target, discord.Guild):
             # For server-wide actions like lockdown
@@ -1005,36 +1823,36 @@ class Moderation(commands.Cog):
             except (ValueError, TypeError):
                 user_id = None
 
-        # Append log data
-        logs.append({
-            'case_id': case_id,
+        return {
+            'case_id': self.modlogs.allocate_case_id(str(guild.id)),
             'action': action,
             'user_id': user_id,
-            'moderator_id': interaction.user.id,
+            'moderator_id': moderator.id,
             'reason': reason,
             'duration': duration,
             'timestamp': datetime.datetime.utcnow().isoformat()
-        })
-        self.data_handler.save_data(self.data)
+        }
 
-        # Format the embed
+    def _case_embed(self, case, moderator):
         embed = discord.Embed(
-            title=f"Moderation Log: Case #{case_id}",
-            description=f"Action: {action}",
+            title=f"Moderation Log: Case #{case['case_id']}",
+            description=f"Action: {case['action']}",
             color=discord.Color.blue(),
             timestamp=datetime.datetime.utcnow()
         )
 
-        embed.add_field(name="Moderator", value=interaction.user.mention, inline=False)
-        embed.add_field(name="Target", value=f"<@{user_id}>" if user_id else "Server-wide action", inline=False)
-        embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
-        embed.add_field(name="Duration", value=duration or "N/A", inline=False)
+        embed.add_field(name="Moderator", value=moderator.mention, inline=False)
+        embed.add_field(name="Target", value=f"<@{case['user_id']}>" if case['user_id'] else "Server-wide action", inline=False)
+        embed.add_field(name="Reason", value=case['reason'] or "No reason provided", inline=False)
+        embed.add_field(name="Duration", value=case['duration'] or "N/A", inline=False)
         embed.add_field(name="Timestamp", value=datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"), inline=False)
+        return embed
 
+    async def _send_modlog(self, guild, embed):
         # Get the log channel from the config
         log_channel_id = self.config.get("mod_log_channel_id")
         if log_channel_id:
-            log_channel = interaction.guild.get_channel(log_channel_id)
+            log_channel = guild.get_channel(log_channel_id)
             if log_channel:
                 await log_channel.send(embed=embed)
             else:
@@ -1042,8 +1860,6 @@ class Moderation(commands.Cog):
         else:
             print("Log channel ID not found in config.")
 
-        return case_id
-
 def parse_time(time_str: str) -> int:
     """Parse a time string like 1d, 2h, 30m into seconds."""
     if not time_str:
@@ -0,0 +1,140 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+from utils.config_manager import ConfigManager
+from utils.data_handler import DataHandler
+from utils.perf import perf
+
+class Perf(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.config_manager = ConfigManager('config.json')
+        self.config = self.config_manager.load_config().get('perf', {})
+        # Not instrumented, or every dump would add to the storage stats it reports
+        self.dump_handler = DataHandler(self.config.get('dump_file', 'data/perf.json'), instrument=False)
+
+        self.command_configs = {
+            'perf': {'enabled': True, 'required_roles': ['@everyone'], 'permissions': ['administrator']},
+        }
+        for name, cfg in self.config.get('commands', {}).items():
+            if name in self.command_configs:
+                self.command_configs[name].update(cfg)
+
+        self._original_tree_error = None
+        self.dump_loop.change_interval(seconds=self.config.get('dump_interval', 60))
+
+    async def cog_load(self):
+        # Hook the tree's error handler so failed app commands are counted too
+        self._original_tree_error = self.bot.tree.on_error
+        self.bot.tree.on_error = self._on_tree_error
+        self.dump_loop.start()
+
+    async def cog_unload(self):
+        self.dump_loop.cancel()
+        if self._original_tree_error is not None:
+            self.bot.tree.on_error = self._original_tree_error
+        self.dump()
+
+    async def check_command_permissions(self, interaction: discord.Interaction, command_name):
+        cfg = self.command_configs.get(command_name, {})
+        if not cfg.get('enabled', True):
+            return False
+        for perm in cfg.get('permissions', []):
+            if not getattr(interaction.user.guild_permissions, perm, False):
+                return False
+        req = cfg.get('required_roles', [])
+        if req and '@everyone' not in req:
+            user_roles = [str(r.id) for r in interaction.user.roles]
+            if not any(rid in user_roles for rid in req):
+                return False
+        return True
+
+    def _record_interaction(self, interaction: discord.Interaction, error=False):
+        command = interaction.command
+        if command is None:
+            return
+        # Measured from when Discord created the interaction, which is what
+        # the 3 second response deadline is counted against
+        elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000
+        perf.record_call(f"/{command.qualified_name}", elapsed, error)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self._record_interaction(interaction)
+
+    async def _on_tree_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        self._record_interaction(interaction, error=True)
+        await self._original_tree_error(interaction, error)
+
+    def snapshot(self):
+        data = perf.snapshot()
+        listeners_cog = self.bot.get_cog('Listeners')
+        if listeners_cog:
+            data['queues'] = listeners_cog.queue_stats()
+        moderation_cog = self.bot.get_cog('Moderation')
+        if moderation_cog:
+            data.setdefault('queues', {})['dm_outbox'] = moderation_cog.outbox.stats()
+        logging_cog = self.bot.get_cog('Logging')
+        if logging_cog:
+            data.setdefault('queues', {})['log_batcher'] = logging_cog.batcher.stats()
+            if logging_cog.webhooks:
+                data['log_webhooks'] = logging_cog.webhooks.stats()
+        return data
+
+    def dump(self):
+        self.dump_handler.save_data(self.snapshot())
+
+    @tasks.loop(seconds=60)
+    async def dump_loop(self):
+        self.dump()
+
+    @dump_loop.before_loop
+    async def before_dump_loop(self):
+        await self.bot.wait_until_ready()
+
+    @app_commands.command(name="perf", description="Show handler latency and storage statistics")
+    @app_commands.describe(sort="What to rank handlers by")
+    @app_commands.choices(sort=[
+        app_commands.Choice(name="calls", value="calls"),
+        app_commands.Choice(name="p99", value="p99_ms"),
+        app_commands.Choice(name="errors", value="errors"),
+    ])
+    async def perf_cmd(self, interaction: discord.Interaction, sort: app_commands.Choice[str] = None):
+        if not await self.check_command_permissions(interaction, 'perf'):
+            return await interaction.response.send_message("❌ No permission.", ephemeral=True)
+
+        data = self.snapshot()
+        key = sort.value if sort else 'calls'
+        handlers = sorted(data['handlers'].items(), key=lambda h: h[1][key], reverse=True)
+
+        lines = [f"{'handler':<32} {'calls':>7} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for name, h in handlers[:20]:
+            lines.append(
+                f"{name[:32]:<32} {h['calls']:>7} {h['errors']:>4} "
+                f"{h['p50_ms']:>6.1f}ms {h['p95_ms']:>6.1f}ms {h['p99_ms']:>6.1f}ms"
+            )
+
+        embed = discord.Embed(
+            title="Performance",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=discord.Color.blurple()
+        )
+
+        storage = sorted(data['storage'].items(), key=lambda s: s[1]['save_bytes'] + s[1]['load_bytes'] + s[1]['append_bytes'], reverse=True)
+        storage_lines = [
+            f"`{path}`: {s['loads']} loads / {s['load_bytes'] // 1024} KiB, {s['saves']} saves / {s['save_bytes'] // 1024} KiB"
+            + (f", {s['appends']} appends / {s['append_bytes'] // 1024} KiB" if s['appends'] else "")
+            for path, s in storage[:8]
+        ]
+        embed.add_field(name="Storage", value="\n".join(storage_lines) or "No storage calls yet", inline=False)
+
+        if 'queues' in data:
+            queue_lines = [f"{name}: {q['depth']}/{q['maxsize']} (dropped {q['dropped']})" for name, q in data['queues'].items()]
+            embed.add_field(name="Queues", value="\n".join(queue_lines), inline=False)
+
+        embed.set_footer(text=f"Uptime {data['uptime_s'] / 3600:.1f}h • full dump in {self.dump_handler.file_path}")
+        self.dump()
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Perf(bot))
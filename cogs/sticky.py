@@ -1,3 +1,5 @@
+import asyncio
+import time
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
@@ -11,7 +13,21 @@ class Sticky(commands.Cog):
         self.data_handler = DataHandler('data/sticky.json')
         self.config_manager = ConfigManager('config.json')
         self.config = self.config_manager.load_config().get('sticky', {})
-        self.sticky_messages = {}
+
+        # Sticky state lives in memory: { channel_id: {message_id, content} }.
+        # The file is only read here and only written when a message ID changes.
+        self.stickies = self.data_handler.load_data()
+        self._locks = {}  # channel_id -> asyncio.Lock serializing reposts
+        self.restore_concurrency = self.config.get('restore_concurrency', 5)
+
+        # Reposts are debounced per channel: a burst of messages produces a single
+        # repost once the channel has been quiet for repost_delay seconds, or at the
+        # latest repost_max_delay seconds after the first message of the burst.
+        self.repost_delay = self.config.get('repost_delay', 3)
+        self.repost_max_delay = self.config.get('repost_max_delay', 15)
+        self._repost_due = {}    # channel_id -> loop time the repost is due
+        self._burst_start = {}   # channel_id -> loop time of the first message in the burst
+        self._repost_tasks = {}  # channel_id -> pending repost task
 
         # Initialize command configurations
         self.command_configs = {
@@ -58,39 +74,76 @@ class Sticky(commands.Cog):
         print("[Sticky] Bot is ready, restoring stickies...")
         await self.sticky_on_ready()
 
+    def _lock(self, channel_id):
+        return self._locks.setdefault(channel_id, asyncio.Lock())
+
+    def _save(self):
+        self.data_handler.save_data(self.stickies)
+
+    async def _delete_by_id(self, channel, message_id):
+        """Delete a message by ID without fetching it first."""
+        try:
+            await channel.get_partial_message(message_id).delete()
+        except discord.NotFound:
+            pass
+
     async def sticky_on_ready(self):
         """Restore sticky messages from file when the bot restarts."""
-        data = self.data_handler.load_data()
-        print('working')
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.restore_concurrency)
+
+        async def restore(channel_id):
+            async with semaphore:
+                try:
+                    return channel_id, await self._restore_channel(channel_id)
+                except discord.HTTPException as e:
+                    print(f"[Sticky] Failed to restore sticky in {channel_id}: {e}")
+                    return channel_id, 'error'
 
-        for channel_id, sticky_data in data.items():
-            channel = self.bot.get_channel(int(channel_id))
-            if not channel:
-                continue
+        results = await asyncio.gather(*(restore(cid) for cid in list(self.stickies)))
+
+        # All repairs are written in one go at the end
+        if any(outcome in ('recovered', 'reposted') for _, outcome in results):
+            self._save()
+
+        summary = {}
+        for channel_id, outcome in results:
+            summary.setdefault(outcome, []).append(channel_id)
+        elapsed = time.perf_counter() - started
+        print(f"[Sticky] Restored {len(results)} stickies in {elapsed:.2f}s: "
+              + ", ".join(f"{outcome}={len(cids)}" for outcome, cids in sorted(summary.items())))
+        for outcome, cids in sorted(summary.items()):
+            if outcome != 'ok':
+                print(f"[Sticky]   {outcome}: {', '.join(cids)}")
+        return summary
+
+    async def _restore_channel(self, channel_id):
+        """Make sure one channel's sticky exists. Returns the outcome, without saving."""
+        channel = self.bot.get_channel(int(channel_id))
+        if not channel:
+            return 'missing_channel'
+
+        async with self._lock(channel_id):
+            sticky_data = self.stickies.get(channel_id)
+            if not sticky_data:
+                return 'missing_channel'
             try:
                 # Try fetching the sticky message by ID
-                msg = await channel.fetch_message(sticky_data['message_id'])
-                self.sticky_messages[channel_id] = msg
+                await channel.fetch_message(sticky_data['message_id'])
+                return 'ok'
             except discord.NotFound:
-                # If message doesn't exist, try sending a new one
-                new_msg = await channel.send(sticky_data['content'])
-                sticky_data['message_id'] = new_msg.id
-                self.sticky_messages[channel_id] = new_msg
-                self.data_handler.save_data(data)  # Save the new message ID
+                pass
 
             # If the bot couldn't find the message, try getting the last 20 messages
-            if channel_id not in self.sticky_messages:
-                async for message in channel.history(limit=20):
-                    if message.content == sticky_data['content']:
-                        self.sticky_messages[channel_id] = message
-                        break
+            async for message in channel.history(limit=20):
+                if message.author == self.bot.user and message.content == sticky_data['content']:
+                    sticky_data['message_id'] = message.id
+                    return 'recovered'
 
             # If sticky message still not found, send a new one
-            if channel_id not in self.sticky_messages:
-                new_msg = await channel.send(sticky_data['content'])
-                sticky_data['message_id'] = new_msg.id
-                self.sticky_messages[channel_id] = new_msg
-                self.data_handler.save_data(data)  # Save the new message ID
+            new_msg = await channel.send(sticky_data['content'])
+            sticky_data['message_id'] = new_msg.id
+            return 'reposted'
 
     @app_commands.command(name="stick", description="Stick a message to the channel")
     async def stick(self, interaction: discord.Interaction, message: str):
@@ -98,17 +151,21 @@ class Sticky(commands.Cog):
         if not await self.check_command_permissions(interaction, 'stick'):
             return await interaction.response.send_message("❌ You don't have permission to use this command!", ephemeral=True)
 
-        data = self.data_handler.load_data()
         channel_id = str(interaction.channel.id)
 
-        # Send and record the sticky message
-        sticky_msg = await interaction.channel.send(message)
-        data[channel_id] = {
-            'message_id': sticky_msg.id,
-            'content': message
-        }
-        self.data_handler.save_data(data)
-        self.sticky_messages[channel_id] = sticky_msg
+        async with self._lock(channel_id):
+            # Replace any sticky already in this channel
+            old = self.stickies.get(channel_id)
+            if old:
+                await self._delete_by_id(interaction.channel, old['message_id'])
+
+            # Send and record the sticky message
+            sticky_msg = await interaction.channel.send(message)
+            self.stickies[channel_id] = {
+                'message_id': sticky_msg.id,
+                'content': message
+            }
+            self._save()
 
         await interaction.response.send_message("📌 Message stuck to channel!", ephemeral=True)
         await interaction.delete_original_response()
@@ -119,48 +176,38 @@ class Sticky(commands.Cog):
         if not await self.check_command_permissions(interaction, 'unstick'):
             return await interaction.response.send_message("❌ You don't have permission to use this command!", ephemeral=True)
 
-        data = self.data_handler.load_data()
         channel_id = str(interaction.channel.id)
 
-        if channel_id not in data:
+        if channel_id not in self.stickies:
             return await interaction.response.send_message("ℹ️ There is no sticky message in this channel.", ephemeral=True)
 
-        # Delete the message if it still exists
-        msg_id = data[channel_id]['message_id']
-        try:
-            msg = await interaction.channel.fetch_message(msg_id)
-            await msg.delete()
-        except discord.NotFound:
-            pass
-
-        # Remove from storage and cache
-        del data[channel_id]
-        self.data_handler.save_data(data)
-        self.sticky_messages.pop(channel_id, None)
+        async with self._lock(channel_id):
+            sticky_data = self.stickies.pop(channel_id, None)
+            if sticky_data:
+                # Delete the message if it still exists
+                await self._delete_by_id(interaction.channel, sticky_data['message_id'])
+                self._save()
 
         await interaction.response.send_message("🗑️ Sticky message removed.", ephemeral=True)
 
     async def update_sticky_message(self, channel):
         """Internal: re-post the sticky message at the bottom"""
-        data = self.data_handler.load_data()
         channel_id = str(channel.id)
-        if channel_id not in data:
-            return
+        # One repost per channel at a time, otherwise overlapping reposts
+        # can each send a copy and leave duplicates behind
+        async with self._lock(channel_id):
+            sticky_data = self.stickies.get(channel_id)
+            if not sticky_data:
+                return
 
-        sticky_data = data[channel_id]
+            # Delete old sticky message
+            await self._delete_by_id(channel, sticky_data['message_id'])
 
-        # Delete old sticky message
-        try:
-            old = await channel.fetch_message(sticky_data['message_id'])
-            await old.delete()
-        except discord.NotFound:
-            pass
-
-        # Re-post sticky message
-        new_msg = await channel.send(sticky_data['content'])
-        data[channel_id]['message_id'] = new_msg.id
-        self.data_handler.save_data(data)
-        self.sticky_messages[channel_id] = new_msg
+            # Re-post sticky message
+            new_msg = await channel.send(sticky_data['content'])
+            if new_msg.id != sticky_data['message_id']:
+                sticky_data['message_id'] = new_msg.id
+                self._save()
 
     async def on_message(self, message):
         """When anyone posts, re-stick the sticky message at the bottom."""
@@ -168,8 +215,43 @@ class Sticky(commands.Cog):
             return
 
         cid = str(message.channel.id)
-        if cid in self.sticky_messages and message.id != self.sticky_messages[cid].id:
-            await self.update_sticky_message(message.channel)
+        if cid in self.stickies and message.id != self.stickies[cid]['message_id']:
+            self.schedule_repost(message.channel)
+
+    def schedule_repost(self, channel):
+        """Push the channel's pending repost back to the end of the quiet window."""
+        cid = str(channel.id)
+        now = asyncio.get_running_loop().time()
+        self._repost_due[cid] = now + self.repost_delay
+        self._burst_start.setdefault(cid, now)
+        if cid not in self._repost_tasks:
+            self._repost_tasks[cid] = asyncio.create_task(self._debounced_repost(channel))
+
+    async def _debounced_repost(self, channel):
+        cid = str(channel.id)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                due = min(self._repost_due[cid], self._burst_start[cid] + self.repost_max_delay)
+                delay = due - loop.time()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            # Clear the burst before reposting so messages arriving during the
+            # repost start a new window instead of being swallowed
+            self._repost_due.pop(cid, None)
+            self._burst_start.pop(cid, None)
+            self._repost_tasks.pop(cid, None)
+
+        try:
+            await self.update_sticky_message(channel)
+        except discord.HTTPException as e:
+            print(f"[Sticky] Failed to repost sticky in {cid}: {e}")
+
+    def cog_unload(self):
+        for task in self._repost_tasks.values():
+            task.cancel()
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
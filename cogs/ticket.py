@@ -5,6 +5,7 @@ from discord.ui import View, Button, Modal, TextInput
 import datetime
 from utils.data_handler import DataHandler
 from utils.config_manager import ConfigManager
+from utils.auto_defer import auto_defer, reply
 
 TICKET_OPEN_CID = "ticket:open_ticket"
 TICKET_CLOSE_PREFIX = "ticket:close_"
@@ -112,10 +113,11 @@ class Ticket(commands.Cog):
     def _save(self):
         self.data_handler.save_data(self.store)
 
+    @auto_defer(ephemeral=True)
     async def _create_ticket(self, interaction: discord.Interaction):
         """Called by the OpenTicketView callback."""
         if not await self.check_perms(interaction, 'ticket_button'):
-            return await interaction.response.send_message("❌ You don't have permission.", ephemeral=True)
+            return await reply(interaction, "❌ You don't have permission.", ephemeral=True)
 
         gid = str(interaction.guild.id)
         uid = str(interaction.user.id)
@@ -125,12 +127,12 @@ class Ticket(commands.Cog):
         if not is_staff:
             for tinfo in data['open_tickets'].values():
                 if tinfo['user_id'] == uid:
-                    return await interaction.response.send_message(self.config.get('already_open_message', "You already have an open ticket."), ephemeral=True)
+                    return await reply(interaction, self.config.get('already_open_message', "You already have an open ticket."), ephemeral=True)
 
         # category
         cat = discord.utils.get(interaction.guild.categories, id=self.config.get('category_id'))
         if not cat:
-            return await interaction.response.send_message("❌ Ticket category not configured.", ephemeral=True)
+            return await reply(interaction, "❌ Ticket category not configured.", ephemeral=True)
 
         # create channel
         channel = await interaction.guild.create_text_channel(
@@ -166,7 +168,7 @@ class Ticket(commands.Cog):
         # register this view so it survives restarts
         self.bot.add_view(view)
 
-        return await interaction.response.send_message(f"✅ Ticket created: {channel.mention}", ephemeral=True)
+        return await reply(interaction, f"✅ Ticket created: {channel.mention}", ephemeral=True)
 
     @app_commands.command(name="ticket", description="Create a new support ticket.")
     async def ticket_cmd(self, interaction: discord.Interaction):
@@ -4,29 +4,46 @@ import json
 import os
 from dotenv import load_dotenv
 from utils.config_manager import ConfigManager
+from utils.intent_planner import IntentPlanner
 
 load_dotenv()
 
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix='/', intents=intents, help_command=None)
-
 config_manager = ConfigManager('config.json')
 config = config_manager.load_config()
 
+def discover_cogs():
+    return [filename[:-3] for filename in os.listdir('./cogs') if filename.endswith('.py')]
+
+# Only ask the gateway for what the enabled cogs actually use
+intent_planner = IntentPlanner(config, discover_cogs())
+intents, member_cache_flags, chunk_guilds = intent_planner.plan()
+for line in intent_planner.summary(intents, chunk_guilds):
+    print(line)
+
+bot = commands.Bot(
+    command_prefix='/',
+    intents=intents,
+    member_cache_flags=member_cache_flags,
+    chunk_guilds_at_startup=chunk_guilds,
+    help_command=None
+)
+
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user.name}')
+    members, saved_bytes, traffic = intent_planner.estimate_savings(intents, chunk_guilds, bot.guilds)
+    print(f'[Intents] ~{saved_bytes / (1024 * 1024):.1f} MB of member/presence cache avoided '
+          f'and ~{traffic:.0%} less gateway traffic across {members} members vs Intents.all()')
     await load_cogs()
     await bot.tree.sync()
 
 async def load_cogs():
-    for filename in os.listdir('./cogs'):
-        if filename.endswith('.py'):
-            try:
-                await bot.load_extension(f'cogs.{filename[:-3]}')
-                print(f'Loaded cog: {filename}')
-            except Exception as e:
-                print(f'Failed to load cog {filename}: {e}')
+    for name in discover_cogs():
+        try:
+            await bot.load_extension(f'cogs.{name}')
+            print(f'Loaded cog: {name}.py')
+        except Exception as e:
+            print(f'Failed to load cog {name}.py: {e}')
 
 @bot.command()
 @commands.has_permissions(administrator=True)
@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import discord
+from utils.perf import perf
+
+# Discord drops an interaction that isn't acknowledged within 3 seconds of being
+# created. The watchdog defers before then; commands whose p95 latency is over
+# PREDICT_SLOW_MS defer straight away.
+WATCHDOG_SECONDS = 2.0
+PREDICT_SLOW_MS = 1500
+MIN_SAMPLES = 5
+
+
+def _lock(interaction):
+    # One lock per interaction so the watchdog's defer and the command's own
+    # response can't both try to acknowledge it
+    return interaction.extras.setdefault('auto_defer_lock', asyncio.Lock())
+
+
+async def defer(interaction, ephemeral=None):
+    """Acknowledge the interaction unless something already has.
+
+    `ephemeral` defaults to what the handler's auto_defer() was given.
+    """
+    if ephemeral is None:
+        ephemeral = interaction.extras.get('auto_defer_ephemeral', False)
+    async with _lock(interaction):
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+            interaction.extras['auto_defer_placeholder'] = ephemeral
+
+
+async def reply(interaction, *args, **kwargs):
+    """Respond to the interaction, as a followup if it has already been deferred."""
+    async with _lock(interaction):
+        if not interaction.response.is_done():
+            return await interaction.response.send_message(*args, **kwargs)
+        placeholder = interaction.extras.pop('auto_defer_placeholder', None)
+        if placeholder is not None and placeholder != kwargs.get('ephemeral', False):
+            # The first followup replaces the "thinking" placeholder and keeps
+            # its visibility; drop it so the reply is as public or private as asked
+            await interaction.delete_original_response()
+        return await interaction.followup.send(*args, **kwargs)
+
+
+def _elapsed_ms(interaction):
+    return (discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000
+
+
+def auto_defer(ephemeral=False, watchdog=WATCHDOG_SECONDS, predict_ms=PREDICT_SLOW_MS):
+    """Decorator for `async def handler(self, interaction, ...)` that defers when a response would be late.
+
+    Defers up front when the handler's recorded p95 latency says it is slow,
+    and otherwise from a watchdog once `watchdog` seconds have passed since the
+    interaction was created. Handlers respond with reply() so they don't need
+    to know which happened.
+
+    Slash commands are already timed under "/<command>" by the Perf cog, so
+    only other interactions (buttons, modals) are recorded here, under the
+    handler's qualified name.
+    """
+    def decorator(func):
+        qualname = func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(self, interaction, *args, **kwargs):
+            interaction.extras['auto_defer_ephemeral'] = ephemeral
+            command = interaction.command
+            name = f"/{command.qualified_name}" if command is not None else qualname
+            stats = perf.handlers.get(name)
+            if stats and stats['calls'] >= MIN_SAMPLES and stats['latency'].percentile(95) >= predict_ms:
+                await defer(interaction, ephemeral)
+
+            async def watch():
+                await asyncio.sleep(max(0.0, watchdog - _elapsed_ms(interaction) / 1000))
+                await defer(interaction, ephemeral)
+
+            watchdog_task = asyncio.create_task(watch())
+            error = False
+            try:
+                return await func(self, interaction, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                watchdog_task.cancel()
+                if command is None:
+                    perf.record_call(name, _elapsed_ms(interaction), error)
+        return wrapper
+    return decorator
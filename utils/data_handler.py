@@ -1,15 +1,20 @@
 import json
 import os
+from utils.perf import perf
 
 class DataHandler:
-    def __init__(self, file_path):
+    def __init__(self, file_path, instrument=True):
         self.file_path = file_path
+        self.instrument = instrument  # False for files that shouldn't count in /perf storage stats
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
     def load_data(self):
         try:
-            with open(self.file_path, 'r') as f:
-                data = json.load(f)
+            with open(self.file_path, 'rb') as f:
+                raw = f.read()
+            if self.instrument:
+                perf.record_storage('load', self.file_path, len(raw))
+            data = json.loads(raw)
             return data
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"Error loading data: {e}")  # Debugging line
@@ -27,6 +32,9 @@ class DataHandler:
     
     def save_data(self, data):
         converted_data = self.convert_sets(data)
+        payload = json.dumps(converted_data, indent=4)
         with open(self.file_path, 'w') as f:
-            json.dump(converted_data, f, indent=4)
+            f.write(payload)
+        if self.instrument:
+            perf.record_storage('save', self.file_path, len(payload.encode()))
 
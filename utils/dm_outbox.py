@@ -0,0 +1,75 @@
+import asyncio
+import discord
+from utils.work_queue import WorkQueue
+
+
+class DmOutbox:
+    """Delivers DMs in the background so commands never wait on them.
+
+    Notices go through a bounded WorkQueue. Transient failures (rate limits,
+    5xx, timeouts) are retried with exponential backoff; closed DMs are not.
+    """
+
+    def __init__(self, maxsize=500, max_attempts=4, retry_delay=5, send_timeout=10):
+        self.queue = WorkQueue('dm_outbox', self._deliver, maxsize=maxsize, overflow='drop_oldest')
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.send_timeout = send_timeout
+        self._retries = set()
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def start(self):
+        self.queue.start()
+
+    async def stop(self):
+        for task in self._retries:
+            task.cancel()
+        await self.queue.stop()
+
+    def stats(self):
+        return {**self.queue.stats(), 'sent': self.sent, 'failed': self.failed, 'retried': self.retried}
+
+    async def send(self, user, text):
+        """Queue a DM and return immediately."""
+        await self.queue.put({'user': user, 'text': text, 'attempt': 0})
+
+    async def send_now(self, user, text, timeout):
+        """Try a DM right away, giving up after `timeout` seconds. Returns whether it was delivered.
+
+        For notices that must arrive before the action that follows, e.g. a
+        kick or ban, after which the user usually can't be messaged.
+        """
+        try:
+            await asyncio.wait_for(user.send(text), timeout)
+        except (discord.HTTPException, asyncio.TimeoutError):
+            self.failed += 1
+            return False
+        self.sent += 1
+        return True
+
+    async def _deliver(self, item):
+        try:
+            await asyncio.wait_for(item['user'].send(item['text']), self.send_timeout)
+        except discord.Forbidden:
+            self.failed += 1  # DMs closed or no shared server, retrying won't help
+            return
+        except (discord.HTTPException, asyncio.TimeoutError) as e:
+            item['attempt'] += 1
+            if item['attempt'] >= self.max_attempts:
+                self.failed += 1
+                print(f"[DmOutbox] Giving up on DM to {item['user'].id}: {e}")
+                return
+            self.retried += 1
+            task = asyncio.create_task(self._retry_later(item, self.retry_delay * 2 ** (item['attempt'] - 1)))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+        self.sent += 1
+
+    async def _retry_later(self, item, delay):
+        # Wait outside the worker so other notices keep flowing meanwhile
+        await asyncio.sleep(delay)
+        await self.queue.put(item)
@@ -0,0 +1,66 @@
+from collections import deque
+
+
+class WarningEscalation:
+    """Rolling-window warning thresholds, e.g. 3 warnings in 7 days -> 1h mute.
+
+    Each (guild, user, rule) keeps a deque of the user's last `count` warning
+    times. A rule fires when the deque is full and its oldest entry is still
+    inside the window, so recording a warning is O(1) per rule no matter how
+    long the user's history is. Older warnings fall off the deque on their own.
+
+    `fired` ({guild_id: {user_id: {rule key: timestamp}}}) records when each
+    rule last fired for a user. The caller persists it, so warnings that
+    already triggered a rule aren't counted again when the deques are
+    rebuilt after a restart or forget().
+    """
+
+    def __init__(self, rules, fired=None):
+        # Most severe (highest count) first, so that rule wins when several fire
+        self.rules = sorted(rules, key=lambda r: r['count'], reverse=True)
+        self.fired = fired if fired is not None else {}
+        self.windows = {}  # (guild_id, user_id) -> [deque per rule]
+
+    @staticmethod
+    def rule_key(rule):
+        return f"{rule['count']}/{rule['window']}/{rule['action']}"
+
+    def _windows(self, key, seed):
+        windows = self.windows.get(key)
+        if windows is None:
+            fired = self.fired.get(str(key[0]), {}).get(str(key[1]), {})
+            history = sorted(seed() if seed else [])
+            windows = self.windows[key] = []
+            for rule in self.rules:
+                since = fired.get(self.rule_key(rule))
+                windows.append(deque((ts for ts in history if since is None or ts > since), maxlen=rule['count']))
+        return windows
+
+    def record(self, guild_id, user_id, timestamp, seed=None):
+        """Add a warning at `timestamp` (epoch seconds) and return the rule it triggers, if any.
+
+        `seed()` supplies the user's earlier warning times the first time the
+        user is seen, so history from before a restart still counts. When
+        a rule fires, its time is written to `fired` for the caller to save.
+        """
+        if not self.rules:
+            return None
+        windows = self._windows((guild_id, user_id), seed)
+        triggered = None
+        for rule, window in zip(self.rules, windows):
+            window.append(timestamp)
+            if len(window) == rule['count'] and timestamp - window[0] <= rule['window']:
+                # Start counting afresh so the next warning doesn't
+                # immediately re-trigger the same punishment
+                window.clear()
+                self.fired.setdefault(str(guild_id), {}).setdefault(str(user_id), {})[self.rule_key(rule)] = timestamp
+                if triggered is None:
+                    triggered = rule
+        return triggered
+
+    def forget(self, guild_id, user_id):
+        """Drop a user's counters, e.g. after a warning is deleted; they reseed on the next warning.
+
+        Fire times are kept, so the reseed still skips warnings already punished.
+        """
+        self.windows.pop((guild_id, user_id), None)
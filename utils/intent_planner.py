@@ -0,0 +1,157 @@
+import discord
+
+# Rough size of what discord.py keeps per member for each cache, in bytes.
+# Only used for the startup estimate, so order of magnitude is what matters.
+MEMBER_CACHE_BYTES = 1024
+PRESENCE_CACHE_BYTES = 1536
+VOICE_STATE_BYTES = 192
+
+# Rough share of gateway traffic each intent accounts for in a large, busy guild.
+GATEWAY_TRAFFIC_SHARE = {
+    'presences': 0.55,
+    'guild_typing': 0.10,
+    'dm_typing': 0.01,
+    'members': 0.05,
+    'voice_states': 0.04,
+    'guild_messages': 0.15,
+    'dm_messages': 0.01,
+    'guild_reactions': 0.04,
+    'dm_reactions': 0.01,
+    'guild_scheduled_events': 0.01,
+    'invites': 0.01,
+    'integrations': 0.005,
+    'webhooks': 0.005,
+    'auto_moderation_configuration': 0.005,
+    'auto_moderation_execution': 0.005,
+    'guild_polls': 0.005,
+    'dm_polls': 0.005,
+}
+
+# Logging config key -> intents the matching event needs
+LOGGING_EVENT_INTENTS = {
+    'message_delete_channel': ('guild_messages', 'message_content'),
+    'message_edit_channel': ('guild_messages', 'message_content'),
+    'bulk_delete_channel': ('guild_messages', 'message_content'),
+    'image_delete_channel': ('guild_messages', 'message_content'),
+    'member_join_channel': ('members',),
+    'member_leave_channel': ('members',),
+    'member_role_add_channel': ('members',),
+    'member_role_remove_channel': ('members',),
+    'member_ban_channel': ('moderation',),
+    'member_unban_channel': ('moderation',),
+    'role_create_channel': ('guilds',),
+    'role_delete_channel': ('guilds',),
+    'role_update_channel': ('guilds',),
+    'channel_create_channel': ('guilds',),
+    'channel_update_channel': ('guilds',),
+    'channel_delete_channel': ('guilds',),
+    'emoji_create_channel': ('emojis_and_stickers',),
+    'emoji_delete_channel': ('emojis_and_stickers',),
+    'emoji_update_channel': ('emojis_and_stickers',),
+    'voice_join_channel': ('voice_states',),
+    'voice_leave_channel': ('voice_states',),
+}
+
+
+class IntentPlanner:
+    """Works out the smallest set of gateway intents the loaded cogs need."""
+
+    def __init__(self, config, cog_names):
+        self.config = config or {}
+        self.cog_names = {name.lower() for name in cog_names}
+        self.reasons = {}  # intent -> [who needs it]
+        self.chunk_reasons = []
+
+    def _enabled(self, section):
+        return self.config.get(section, {}).get('enabled', True)
+
+    def _require(self, who, *flags):
+        for flag in flags:
+            needed_by = self.reasons.setdefault(flag, [])
+            if who not in needed_by:
+                needed_by.append(who)
+
+    def _collect(self):
+        self.reasons = {}
+        self.chunk_reasons = []
+
+        # Always needed: guild/channel/role cache and the prefix commands in main.py
+        self._require('core', 'guilds')
+        self._require('prefix commands', 'guild_messages', 'message_content')
+
+        if 'leveling' in self.cog_names and self._enabled('leveling'):
+            self._require('leveling', 'guild_messages')
+
+        if 'analytics' in self.cog_names and self._enabled('analytics'):
+            self._require('analytics', 'guild_messages')
+            if self.config.get('analytics', {}).get('track_presence', True):
+                self._require('analytics presence tracking', 'presences', 'members')
+
+        if 'sticky' in self.cog_names:
+            self._require('sticky', 'guild_messages')
+
+        if 'fireboard' in self.cog_names:
+            self._require('fireboard', 'guild_reactions', 'guild_messages', 'message_content')
+
+        if 'logging' in self.cog_names:
+            logging_cfg = self.config.get('logging', {})
+            for key, flags in LOGGING_EVENT_INTENTS.items():
+                if logging_cfg.get(key):
+                    self._require('logging', *flags)
+
+        if 'antispam' in self.cog_names and self._enabled('antispam'):
+            # Duplicate detection hashes message content; joins feed the raid detector
+            self._require('antispam', 'guild_messages', 'message_content', 'members')
+
+        if 'intro' in self.cog_names and self._enabled('intro'):
+            self._require('intro', 'members')
+
+        if 'moderation' in self.cog_names and self._enabled('moderation'):
+            self._require('moderation', 'members')
+            # The /members role index and the timed actions read the full member cache
+            self.chunk_reasons.append('moderation')
+
+    def plan(self):
+        """Return (intents, member_cache_flags, chunk_guilds_at_startup)."""
+        self._collect()
+        intents = discord.Intents.none()
+        for flag in self.reasons:
+            setattr(intents, flag, True)
+
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+        chunk = intents.members and bool(self.chunk_reasons)
+        return intents, member_cache_flags, chunk
+
+    def dropped_intents(self, intents):
+        full = discord.Intents.all()
+        dropped = []
+        for flag in GATEWAY_TRAFFIC_SHARE:
+            if getattr(full, flag) and not getattr(intents, flag):
+                dropped.append(flag)
+        if not intents.message_content:
+            dropped.append('message_content')
+        return dropped
+
+    def summary(self, intents, chunk):
+        lines = ["[Intents] Requested: " + ", ".join(sorted(self.reasons))]
+        for flag in sorted(self.reasons):
+            lines.append(f"[Intents]   {flag}: {', '.join(self.reasons[flag])}")
+        dropped = self.dropped_intents(intents)
+        lines.append("[Intents] Not requested: " + (", ".join(dropped) or "none"))
+        lines.append(f"[Intents] Member chunking at startup: {'on' if chunk else 'off'}")
+        return lines
+
+    def estimate_savings(self, intents, chunk, guilds):
+        """Estimate the memory and gateway traffic saved compared to Intents.all()."""
+        members = sum(g.member_count or 0 for g in guilds)
+        saved_bytes = 0
+        if not intents.presences:
+            saved_bytes += members * PRESENCE_CACHE_BYTES
+        if not chunk:
+            saved_bytes += members * MEMBER_CACHE_BYTES
+        if not intents.voice_states:
+            # Only a fraction of members sit in voice at any time
+            saved_bytes += members * VOICE_STATE_BYTES // 20
+
+        traffic = sum(GATEWAY_TRAFFIC_SHARE[flag] for flag in self.dropped_intents(intents) if flag in GATEWAY_TRAFFIC_SHARE)
+        return members, saved_bytes, min(traffic, 1.0)
@@ -0,0 +1,100 @@
+import asyncio
+import collections
+
+# Discord's limits per message
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000  # combined across all embeds
+
+
+class LogBatcher:
+    """Buffers log embeds per channel and sends them as multi-embed messages.
+
+    Buffers are flushed every `interval` seconds, or straight away once a
+    channel has a full message's worth waiting. Channels flush concurrently;
+    within a channel batches go out in order. `send(channel_id, embeds)` does
+    the actual delivery; a batch it fails on goes back to the front of the
+    buffer and is retried on later flushes, up to `max_attempts` times.
+    """
+
+    def __init__(self, send, interval=2.0, max_pending=500, max_attempts=3):
+        self.send = send
+        self.interval = interval
+        self.max_pending = max_pending  # per channel, oldest dropped beyond this
+        self.max_attempts = max_attempts
+        self.buffers = {}  # channel_id -> deque of embeds
+        self._failures = {}  # channel_id -> consecutive failed sends
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+        self.messages = 0
+        self.embeds = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher, letting a flush in progress finish, and send whatever is still buffered."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+        await self.flush()
+
+    def stats(self):
+        depth = sum(len(buf) for buf in self.buffers.values())
+        return {
+            'depth': depth, 'maxsize': self.max_pending, 'dropped': self.dropped,
+            'messages': self.messages, 'embeds': self.embeds, 'errors': self.errors,
+        }
+
+    def add(self, channel_id, embed):
+        buf = self.buffers.setdefault(channel_id, collections.deque())
+        if len(buf) >= self.max_pending:
+            buf.popleft()
+            self.dropped += 1
+        buf.append(embed)
+        if len(buf) >= MAX_EMBEDS:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        pending = [channel_id for channel_id, buf in self.buffers.items() if buf]
+        await asyncio.gather(*(self._flush_channel(channel_id) for channel_id in pending))
+
+    async def _flush_channel(self, channel_id):
+        buf = self.buffers[channel_id]
+        while buf:
+            batch = [buf.popleft()]
+            size = len(batch[0])
+            while buf and len(batch) < MAX_EMBEDS and size + len(buf[0]) <= MAX_EMBED_CHARS:
+                size += len(buf[0])
+                batch.append(buf.popleft())
+            try:
+                await self.send(channel_id, batch)
+            except Exception as e:
+                self.errors += 1
+                failures = self._failures[channel_id] = self._failures.get(channel_id, 0) + 1
+                if failures >= self.max_attempts:
+                    self._failures[channel_id] = 0
+                    self.dropped += len(batch)
+                    print(f"[LogBatcher] Dropping {len(batch)} log embeds for {channel_id} after {failures} attempts: {e}")
+                    continue
+                print(f"[LogBatcher] Failed to send {len(batch)} log embeds to {channel_id}, will retry: {e}")
+                buf.extendleft(reversed(batch))
+                return
+            self._failures[channel_id] = 0
+            self.messages += 1
+            self.embeds += len(batch)
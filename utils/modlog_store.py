@@ -0,0 +1,197 @@
+import datetime
+import json
+import os
+import shutil
+from utils.perf import perf
+
+
+class ModlogStore:
+    """Moderation cases per guild, indexed by case ID, target user and moderator.
+
+    Cases live in append-only JSON-lines segments, one file per month:
+    data/modlogs/<guild_id>/<YYYY-MM>.jsonl. A segment line is either a case or
+    an amendment ({"amend": case_id, "fields": {...}}) to an earlier case, so
+    past segments are never rewritten. A guild's segments are only read the
+    first time its cases are queried; logging a new case is a single append.
+    """
+
+    def __init__(self, base_dir='data/modlogs'):
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self.counters = {}      # guild_id -> last allocated case ID
+        self.loaded = set()     # guild_ids whose segments have been read
+        self.by_case = {}       # guild_id -> {case_id: case}
+        self.by_user = {}       # guild_id -> {user_id: [case, ...]} in case order
+        self.by_moderator = {}  # guild_id -> {moderator_id: [case, ...]} in case order
+
+    # --- segment files ---
+
+    def _guild_dir(self, gid):
+        return os.path.join(self.base_dir, gid)
+
+    def _segments(self, gid):
+        """Segment paths for a guild, oldest first."""
+        try:
+            names = os.listdir(self._guild_dir(gid))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self._guild_dir(gid), n) for n in sorted(names) if n.endswith('.jsonl')]
+
+    @staticmethod
+    def _segment_name(timestamp=None):
+        try:
+            when = datetime.datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            when = datetime.datetime.utcnow()
+        return when.strftime('%Y-%m') + '.jsonl'
+
+    def _read_segment(self, path):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        perf.record_storage('load', path, len(raw))
+        records = []
+        for line in raw.splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[Modlogs] Skipping corrupt line in {path}")
+        return records
+
+    def _write(self, gid, records, segment=None):
+        os.makedirs(self._guild_dir(gid), exist_ok=True)
+        path = os.path.join(self._guild_dir(gid), segment or self._segment_name())
+        payload = ''.join(json.dumps(r) + '\n' for r in records)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+        perf.record_storage('append', path, len(payload.encode()))
+
+    # --- indexes ---
+
+    def _index(self, gid, case):
+        self.by_case.setdefault(gid, {})[case['case_id']] = case
+        if case.get('user_id') is not None:
+            self.by_user.setdefault(gid, {}).setdefault(case['user_id'], []).append(case)
+        self.by_moderator.setdefault(gid, {}).setdefault(case['moderator_id'], []).append(case)
+
+    def read_cases(self, gid):
+        """Read a guild's cases straight from its segments, amendments applied, oldest first.
+
+        Touches no in-memory state, so it is safe to call from a worker thread.
+        """
+        cases = {}
+        for path in self._segments(gid):
+            for record in self._read_segment(path):
+                if 'amend' in record:
+                    case = cases.get(record['amend'])
+                    if case is not None:
+                        case.update(record['fields'])
+                elif record.get('case_id') not in cases:
+                    cases[record['case_id']] = record
+        return [cases[case_id] for case_id in sorted(cases)]
+
+    def _ensure_loaded(self, gid):
+        if gid in self.loaded:
+            return
+        self.loaded.add(gid)
+        cases = self.by_case.setdefault(gid, {})
+        for case in self.read_cases(gid):
+            if case['case_id'] not in cases:
+                self._index(gid, case)
+        if cases:
+            self.counters[gid] = max(self.counters.get(gid, 0), max(cases))
+
+    def _last_case_id(self, gid):
+        """Highest case ID on disk, read from the newest segment that has a case."""
+        if gid in self.loaded:
+            return max(self.by_case.get(gid, {}), default=0)
+        for path in reversed(self._segments(gid)):
+            ids = [r['case_id'] for r in self._read_segment(path) if 'case_id' in r]
+            if ids:
+                return max(ids)
+        return 0
+
+    # --- public API ---
+
+    def guild_ids(self):
+        """Guilds that have segments on disk."""
+        return [name for name in os.listdir(self.base_dir)
+                if not name.endswith('.migrating') and os.path.isdir(os.path.join(self.base_dir, name))]
+
+    def allocate_case_id(self, gid):
+        """Next case ID for the guild. IDs are never reused, even if a case is lost."""
+        if gid not in self.counters:
+            self.counters[gid] = self._last_case_id(gid)
+        self.counters[gid] += 1
+        return self.counters[gid]
+
+    def append(self, gid, case):
+        """Persist a new case with a single append and index it if the guild is loaded."""
+        return self.append_many(gid, [case])[0]
+
+    def append_many(self, gid, cases):
+        """Persist several cases in one write, e.g. for a mass action."""
+        if cases:
+            self._write(gid, cases)
+            if gid in self.loaded:
+                for case in cases:
+                    self._index(gid, case)
+        return cases
+
+    def amend(self, gid, case_id, **fields):
+        """Change fields of an existing case by appending an amendment record."""
+        case = self.get(gid, case_id)
+        if case is None:
+            return None
+        case.update(fields)
+        self._write(gid, [{'amend': case_id, 'fields': fields}])
+        return case
+
+    def get(self, gid, case_id):
+        self._ensure_loaded(gid)
+        return self.by_case.get(gid, {}).get(case_id)
+
+    def cases(self, gid):
+        """Every case in the guild, oldest first."""
+        self._ensure_loaded(gid)
+        return sorted(self.by_case.get(gid, {}).values(), key=lambda c: c['case_id'])
+
+    def for_user(self, gid, user_id):
+        self._ensure_loaded(gid)
+        return self.by_user.get(gid, {}).get(user_id, [])
+
+    def for_moderator(self, gid, moderator_id):
+        self._ensure_loaded(gid)
+        return self.by_moderator.get(gid, {}).get(moderator_id, [])
+
+    def import_legacy(self, modlogs):
+        """Move cases kept in moderation.json into segments. Returns the number moved.
+
+        Each guild's segments are written to a staging directory that is renamed
+        into place only once all of them are on disk, so a crash part-way
+        leaves the guild looking unmigrated and the next start redoes it.
+        """
+        moved = 0
+        for gid, cases in modlogs.items():
+            if self._segments(gid):
+                continue  # already migrated
+            by_segment = {}
+            for case in cases:
+                by_segment.setdefault(self._segment_name(case.get('timestamp')), []).append(case)
+
+            staging = self._guild_dir(gid) + '.migrating'
+            shutil.rmtree(staging, ignore_errors=True)  # left over from an interrupted run
+            os.makedirs(staging)
+            for segment, records in sorted(by_segment.items()):
+                path = os.path.join(staging, segment)
+                payload = ''.join(json.dumps(r) + '\n' for r in records)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                perf.record_storage('save', path, len(payload.encode()))
+            if os.path.isdir(self._guild_dir(gid)):
+                os.rmdir(self._guild_dir(gid))  # empty, it had no segments
+            os.replace(staging, self._guild_dir(gid))
+            moved += len(cases)
+        return moved
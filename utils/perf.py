@@ -0,0 +1,119 @@
+import bisect
+import functools
+import time
+
+# Latency histogram bucket upper bounds in milliseconds: ~25% apart, from
+# 0.05ms up to about 3 minutes. Anything slower lands in the overflow bucket.
+BUCKET_BOUNDS_MS = []
+_bound = 0.05
+while _bound < 180000:
+    BUCKET_BOUNDS_MS.append(round(_bound, 3))
+    _bound *= 1.25
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram, so memory doesn't grow with call count."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in ms."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                if i >= len(BUCKET_BOUNDS_MS):
+                    return self.max_ms
+                return min(BUCKET_BOUNDS_MS[i], self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 3),
+        }
+
+
+class PerfRecorder:
+    """Process-wide counters for handler latency and storage I/O."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.handlers = {}  # name -> {'calls', 'errors', 'latency'}
+        self.storage = {}   # file path -> {'loads', 'load_bytes', 'saves', 'save_bytes', 'appends', 'append_bytes'}
+
+    def record_call(self, name, elapsed_ms, error=False):
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = {'calls': 0, 'errors': 0, 'latency': LatencyHistogram()}
+        stats['calls'] += 1
+        if error:
+            stats['errors'] += 1
+        stats['latency'].record(elapsed_ms)
+
+    def record_storage(self, op, path, nbytes):
+        stats = self.storage.setdefault(path, {'loads': 0, 'load_bytes': 0, 'saves': 0, 'save_bytes': 0, 'appends': 0, 'append_bytes': 0})
+        if op == 'load':
+            stats['loads'] += 1
+            stats['load_bytes'] += nbytes
+        elif op == 'append':
+            stats['appends'] += 1
+            stats['append_bytes'] += nbytes
+        else:
+            stats['saves'] += 1
+            stats['save_bytes'] += nbytes
+
+    def percentile(self, name, pct):
+        stats = self.handlers.get(name)
+        if stats is None:
+            return None
+        return stats['latency'].percentile(pct)
+
+    def instrument(self, name=None):
+        """Decorator timing an async function as handler `name` (defaults to its qualname)."""
+        def decorator(func):
+            handler_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                error = False
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    error = True
+                    raise
+                finally:
+                    self.record_call(handler_name, (time.perf_counter() - start) * 1000, error)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        return {
+            'started': self.started,
+            'uptime_s': round(time.time() - self.started, 1),
+            'handlers': {
+                name: {'calls': s['calls'], 'errors': s['errors'], **s['latency'].to_dict()}
+                for name, s in self.handlers.items()
+            },
+            'storage': {path: dict(s) for path, s in self.storage.items()},
+        }
+
+
+perf = PerfRecorder()
@@ -0,0 +1,161 @@
+import re
+
+# Role mention, raw role ID, or an operator/parenthesis
+TOKEN_RE = re.compile(r"\s*(?:<@&(\d+)>|(\d+)|([&|()\-]))")
+
+
+class RoleIndex:
+    """role ID -> set of member IDs per guild, kept current from member events.
+
+    A guild is indexed the first time it is queried, after which join, leave,
+    member update and role delete events keep it in sync, so queries never
+    walk the member cache again.
+    """
+
+    def __init__(self):
+        self.guilds = {}  # guild_id -> {role_id: {member_id, ...}}
+
+    def _build(self, guild):
+        index = {}
+        for member in guild.members:
+            for role in member.roles:
+                index.setdefault(role.id, set()).add(member.id)
+        self.guilds[guild.id] = index
+        return index
+
+    def members_of(self, guild, role_id):
+        index = self.guilds.get(guild.id)
+        if index is None:
+            index = self._build(guild)
+        return index.get(role_id, set())
+
+    # --- event hooks, cheap no-ops until a guild has been indexed ---
+
+    def member_join(self, member):
+        index = self.guilds.get(member.guild.id)
+        if index is not None:
+            for role in member.roles:
+                index.setdefault(role.id, set()).add(member.id)
+
+    def member_remove(self, member):
+        index = self.guilds.get(member.guild.id)
+        if index is not None:
+            for role in member.roles:
+                index.get(role.id, set()).discard(member.id)
+
+    def member_update(self, before, after):
+        index = self.guilds.get(after.guild.id)
+        if index is None or before.roles == after.roles:
+            return
+        old = {r.id for r in before.roles}
+        new = {r.id for r in after.roles}
+        for role_id in old - new:
+            index.get(role_id, set()).discard(after.id)
+        for role_id in new - old:
+            index.setdefault(role_id, set()).add(after.id)
+
+    def role_delete(self, role):
+        index = self.guilds.get(role.guild.id)
+        if index is not None:
+            index.pop(role.id, None)
+
+    # --- expressions ---
+
+    def evaluate(self, guild, expression):
+        """Evaluate a role expression to (member ID set, roles referenced).
+
+        Operators follow Python's set precedence: `-` binds tightest, then `&`,
+        then `|`. Roles written next to each other with no operator are a union,
+        so "@A @B" keeps meaning "anyone in A or B". Raises ValueError on a
+        malformed expression or an unknown role.
+        """
+        tokens = self._tokenize(expression)
+        parser = _Parser(tokens, lambda role_id: self._operand(guild, role_id))
+        result = parser.parse()
+        return result, parser.roles
+
+    def _operand(self, guild, role_id):
+        role = guild.get_role(role_id)
+        if role is None:
+            raise ValueError(f"Unknown role {role_id}")
+        return role, self.members_of(guild, role_id)
+
+    @staticmethod
+    def _tokenize(expression):
+        tokens, pos = [], 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = TOKEN_RE.match(expression, pos)
+            if not match:
+                raise ValueError(f"Unexpected input at: {expression[pos:pos + 20]}")
+            mention, raw_id, op = match.groups()
+            tokens.append(('role', int(mention or raw_id)) if op is None else ('op', op))
+            pos = match.end()
+        if not tokens:
+            raise ValueError("Empty expression")
+        return tokens
+
+
+class _Parser:
+    """Recursive descent parser that evaluates set expressions as it goes."""
+
+    def __init__(self, tokens, operand):
+        self.tokens = tokens
+        self.pos = 0
+        self.operand = operand
+        self.roles = []
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _take_op(self, op):
+        if self._peek() == ('op', op):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        result = self._union()
+        if self._peek() is not None:
+            raise ValueError(f"Unexpected '{self._peek()[1]}'")
+        return set(result)  # operands are the live index sets
+
+    def _union(self):
+        result = self._intersection()
+        while True:
+            token = self._peek()
+            if self._take_op('|'):
+                result = result | self._intersection()
+            elif token == ('op', '(') or (token and token[0] == 'role'):
+                result = result | self._intersection()  # implicit union
+            else:
+                return result
+
+    def _intersection(self):
+        result = self._difference()
+        while self._take_op('&'):
+            result = result & self._difference()
+        return result
+
+    def _difference(self):
+        result = self._atom()
+        while self._take_op('-'):
+            result = result - self._atom()
+        return result
+
+    def _atom(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Expression ends early")
+        self.pos += 1
+        if token[0] == 'role':
+            role, members = self.operand(token[1])
+            if role not in self.roles:
+                self.roles.append(role)
+            return members
+        if token[1] == '(':
+            result = self._union()
+            if not self._take_op(')'):
+                raise ValueError("Missing ')'")
+            return result
+        raise ValueError(f"Unexpected '{token[1]}'")
@@ -0,0 +1,116 @@
+import array
+import base64
+import sys
+import time
+from utils.data_handler import DataHandler
+
+
+def pack(role_ids):
+    """Role IDs -> base64 of little-endian uint64s."""
+    packed = array.array('Q', sorted(role_ids))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode('ascii')
+
+
+def unpack(text):
+    packed = array.array('Q')
+    packed.frombytes(base64.b64decode(text))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed
+
+
+class RoleSnapshots:
+    """Persisted roles per member, stored as packed arrays of 64-bit role IDs.
+
+    Each guild maps member ID -> [role IDs, time the member left or None].
+    In memory the role IDs are an array('Q'), on disk a base64 string, so
+    an entry costs 8 bytes per role rather than a JSON list of numbers.
+    Entries for members who left more than `retention` seconds ago expire.
+    """
+
+    def __init__(self, path, retention):
+        self.data_handler = DataHandler(path)
+        self.retention = retention
+        self.guilds = {}  # guild_id -> {member_id: [array('Q'), left_at]}
+        for gid, members in self.data_handler.load_data().items():
+            self.guilds[int(gid)] = {int(uid): [unpack(packed), left_at] for uid, (packed, left_at) in members.items()}
+
+    def save(self):
+        self.data_handler.save_data({
+            str(gid): {str(uid): [pack(roles), left_at] for uid, (roles, left_at) in members.items()}
+            for gid, members in self.guilds.items() if members
+        })
+
+    def _expired(self, entry, now):
+        return entry[1] is not None and self.retention and now - entry[1] > self.retention
+
+    def roles(self, guild_id, member_id):
+        entry = self.guilds.get(guild_id, {}).get(member_id)
+        return set(entry[0]) if entry else set()
+
+    def set_roles(self, guild_id, member_id, role_ids):
+        """Replace a member's persisted roles; an empty set removes the entry."""
+        members = self.guilds.setdefault(guild_id, {})
+        if role_ids:
+            left_at = members[member_id][1] if member_id in members else None
+            members[member_id] = [array.array('Q', sorted(role_ids)), left_at]
+        else:
+            members.pop(member_id, None)
+        self.save()
+
+    def member_left(self, member, now=None):
+        """Keep the persisted roles the member still had when they left. Returns whether anything was kept."""
+        members = self.guilds.get(member.guild.id, {})
+        entry = members.get(member.id)
+        if entry is None:
+            return False
+        held = {r.id for r in member.roles}
+        kept = [rid for rid in entry[0] if rid in held]
+        if kept:
+            members[member.id] = [array.array('Q', kept), now or time.time()]
+        else:
+            del members[member.id]
+        self.save()
+        return bool(kept)
+
+    def member_joined(self, member, now=None):
+        """Return the role IDs to restore for a rejoining member (empty if none or expired)."""
+        members = self.guilds.get(member.guild.id, {})
+        entry = members.get(member.id)
+        if entry is None:
+            return set()
+        if self._expired(entry, now or time.time()):
+            del members[member.id]
+            self.save()
+            return set()
+        # Still persisted while they're here, so they come back again next time
+        if entry[1] is not None:
+            entry[1] = None
+            self.save()
+        return set(entry[0])
+
+    def expire(self, now=None):
+        """Drop every expired entry. Returns how many were removed."""
+        now = now or time.time()
+        removed = 0
+        for members in self.guilds.values():
+            stale = [uid for uid, entry in members.items() if self._expired(entry, now)]
+            for uid in stale:
+                del members[uid]
+            removed += len(stale)
+        if removed:
+            self.save()
+        return removed
+
+    def import_legacy(self, persisted_roles):
+        """Load the old moderation.json `persisted_roles` ({gid: {uid: [role_id, ...]}}). Returns members imported."""
+        count = 0
+        for gid, members in persisted_roles.items():
+            for uid, role_ids in members.items():
+                if role_ids:
+                    self.guilds.setdefault(int(gid), {})[int(uid)] = [array.array('Q', sorted(role_ids)), None]
+                    count += 1
+        self.save()
+        return count
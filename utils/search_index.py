@@ -0,0 +1,67 @@
+import math
+import re
+from collections import Counter
+
+WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [w for w in WORD_RE.findall((text or '').lower()) if len(w) > 1]
+
+
+class SearchIndex:
+    """Token inverted index over short moderation texts, ranked by TF-IDF.
+
+    Documents are added and removed one at a time, so keeping the index
+    current costs proportional to the text changed, and a query only visits
+    documents sharing at least one of its words.
+    """
+
+    def __init__(self):
+        self.postings = {}  # token -> {doc key: occurrences}
+        self.docs = {}      # doc key -> metadata passed to add(), plus 'tokens'
+
+    def add(self, key, text, **meta):
+        """Index (or re-index) a document under `key`."""
+        self.remove(key)
+        counts = Counter(tokenize(text))
+        meta['text'] = text or ''
+        meta['tokens'] = counts
+        self.docs[key] = meta
+        for token, n in counts.items():
+            self.postings.setdefault(token, {})[key] = n
+
+    def remove(self, key):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        for token in doc['tokens']:
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self.postings[token]
+
+    def search(self, query, accept=None):
+        """Documents matching any query word, best first, as (score, doc) pairs.
+
+        `accept(doc)` filters candidates. Ties are broken newest first by the
+        doc's 'time'.
+        """
+        scores = {}
+        total = len(self.docs)
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + total / len(posting))
+            for key, n in posting.items():
+                scores[key] = scores.get(key, 0.0) + (1 + math.log(n)) * idf
+
+        results = []
+        for key, score in scores.items():
+            doc = self.docs[key]
+            if accept is None or accept(doc):
+                results.append((score, doc))
+        results.sort(key=lambda r: (r[0], r[1].get('time') or ''), reverse=True)
+        return results
@@ -0,0 +1,93 @@
+from collections import OrderedDict, deque
+
+# Limits used when the antispam config doesn't set them: `count` events within `window` seconds
+DEFAULT_LIMITS = {
+    'message_rate': {'count': 6, 'window': 5},
+    'duplicates':   {'count': 4, 'window': 30},
+    'mentions':     {'count': 10, 'window': 15},
+    'join_rate':    {'count': 10, 'window': 30},
+}
+
+
+class SlidingWindow:
+    """The last `count` event times in a ring buffer; trips when all of them fall within `window` seconds."""
+
+    __slots__ = ('times', 'window')
+
+    def __init__(self, count, window):
+        self.times = deque(maxlen=count)
+        self.window = window
+
+    def hit(self, now, n=1):
+        for _ in range(min(n, self.times.maxlen)):
+            self.times.append(now)
+        return len(self.times) == self.times.maxlen and now - self.times[0] <= self.window
+
+    def clear(self):
+        self.times.clear()
+
+
+class _UserState:
+    __slots__ = ('messages', 'mentions', 'hashes')
+
+    def __init__(self, limits):
+        self.messages = SlidingWindow(**limits['message_rate'])
+        self.mentions = SlidingWindow(**limits['mentions'])
+        self.hashes = deque(maxlen=limits['duplicates']['count'])  # (time, content hash)
+
+
+class SpamDetector:
+    """Per-user flood and per-guild join-rate detection in constant time and bounded memory.
+
+    Every buffer is a fixed-size ring, and per-user state is an LRU capped at
+    `max_users`, so neither the per-event cost nor memory depends on guild size.
+    """
+
+    def __init__(self, limits=None, max_users=5000):
+        self.limits = {name: dict(DEFAULT_LIMITS[name], **(limits or {}).get(name, {})) for name in DEFAULT_LIMITS}
+        self.max_users = max_users
+        self.users = OrderedDict()  # (guild_id, user_id) -> _UserState, least recently active first
+        self.joins = {}             # guild_id -> SlidingWindow
+
+    def _user(self, key):
+        state = self.users.get(key)
+        if state is None:
+            state = self.users[key] = _UserState(self.limits)
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(key)
+        return state
+
+    def check_message(self, guild_id, user_id, content, mention_count, now):
+        """Record a message; return which limit it broke ('message_rate', 'duplicates', 'mentions') or None."""
+        state = self._user((guild_id, user_id))
+        reason = None
+        if state.messages.hit(now):
+            reason = 'message_rate'
+        if mention_count and state.mentions.hit(now, mention_count):
+            reason = reason or 'mentions'
+
+        text = (content or '').strip().lower()
+        if text:
+            digest = hash(text)
+            state.hashes.append((now, digest))
+            if (len(state.hashes) == state.hashes.maxlen
+                    and now - state.hashes[0][0] <= self.limits['duplicates']['window']
+                    and all(d == digest for _, d in state.hashes)):
+                reason = reason or 'duplicates'
+
+        if reason:
+            # Start over so one flood triggers one action, not one per message
+            self.users.pop((guild_id, user_id), None)
+        return reason
+
+    def check_join(self, guild_id, now):
+        """Record a join; return True when the guild's join rate trips the raid limit."""
+        window = self.joins.get(guild_id)
+        if window is None:
+            window = self.joins[guild_id] = SlidingWindow(**self.limits['join_rate'])
+        if window.hit(now):
+            window.clear()
+            return True
+        return False
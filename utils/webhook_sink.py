@@ -0,0 +1,151 @@
+import asyncio
+import time
+import aiohttp
+import discord
+from utils.data_handler import DataHandler
+
+
+class _Bucket:
+    """One webhook's rate limit, from the X-RateLimit headers of its last response."""
+
+    __slots__ = ('lock', 'remaining', 'reset_at')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()  # one request per webhook at a time, which also keeps order
+        self.remaining = 1
+        self.reset_at = 0.0
+
+    async def wait(self):
+        if self.remaining <= 0:
+            await asyncio.sleep(max(0.0, self.reset_at - time.monotonic()))
+
+    def update(self, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is not None and reset_after is not None:
+            self.remaining = int(remaining)
+            self.reset_at = time.monotonic() + float(reset_after)
+
+
+class WebhookSink:
+    """Posts log embeds through a webhook per channel instead of the bot's own sends.
+
+    Webhook executions have their own rate limits, separate from the bot's,
+    so heavy logging doesn't slow down moderation actions and replies.
+    Requests go through a dedicated aiohttp session, and each webhook has its
+    own bucket that waits out its limit before the next request. Webhook URLs
+    are cached on disk so the bot only looks them up or creates them once.
+    """
+
+    def __init__(self, bot, cache_path='data/log_webhooks.json', name='Logs', pool_size=10, max_retries=3):
+        self.bot = bot
+        self.name = name
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.data_handler = DataHandler(cache_path)
+        self.urls = self.data_handler.load_data()  # str(channel_id) -> webhook URL
+        self.buckets = {}  # webhook URL -> _Bucket
+        self.session = None
+        self._setup_locks = {}
+
+        self.sent = 0
+        self.rate_limited = 0
+        self.uncertain = 0  # posts that timed out or dropped mid-request
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+
+    async def _webhook_url(self, channel):
+        key = str(channel.id)
+        if key in self.urls:
+            return self.urls[key]
+        async with self._setup_locks.setdefault(key, asyncio.Lock()):
+            if key not in self.urls:
+                # Reuse one of our own webhooks from an earlier run before making another
+                hooks = await channel.webhooks()
+                hook = next((h for h in hooks if h.token and h.user and h.user.id == self.bot.user.id), None)
+                if hook is None:
+                    hook = await channel.create_webhook(name=self.name, reason="Log delivery")
+                self.urls[key] = hook.url
+                self.data_handler.save_data(self.urls)
+        return self.urls[key]
+
+    def _forget(self, channel):
+        url = self.urls.pop(str(channel.id), None)
+        self.buckets.pop(url, None)
+        self.data_handler.save_data(self.urls)
+
+    async def send(self, channel, embeds):
+        """Post `embeds` to `channel` through its webhook. Returns False when the caller should fall back to the bot.
+
+        A post that times out or is cut off after being sent isn't retried or
+        handed back, since Discord may already have accepted it.
+        """
+        if self.session is None:
+            return False
+        try:
+            url = await self._webhook_url(channel)
+        except discord.HTTPException as e:
+            print(f"[WebhookSink] No webhook for #{channel} ({e}), using the bot instead")
+            return False
+
+        payload = {
+            'embeds': [embed.to_dict() for embed in embeds],
+            'username': self.bot.user.display_name,
+            'avatar_url': self.bot.user.display_avatar.url,
+            'allowed_mentions': {'parse': []},
+        }
+        bucket = self.buckets.setdefault(url, _Bucket())
+        async with bucket.lock:
+            for _ in range(self.max_retries):
+                await bucket.wait()
+                try:
+                    async with self.session.post(url, json=payload) as resp:
+                        bucket.update(resp.headers)
+                        if resp.status == 429:
+                            self.rate_limited += 1
+                            await asyncio.sleep(await self._retry_after(resp))
+                            continue
+                        if resp.status == 404:
+                            # Webhook was deleted; make a new one next time
+                            self._forget(channel)
+                            return False
+                        if resp.status >= 400:
+                            print(f"[WebhookSink] Webhook post to #{channel} failed: {resp.status} {await resp.text()}")
+                            return False
+                        self.sent += 1
+                        return True
+                except aiohttp.ClientConnectorError as e:
+                    # Never reached Discord, so the bot can safely send it instead
+                    print(f"[WebhookSink] Webhook post to #{channel} failed: {e}")
+                    return False
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # The request may already have been accepted; falling back
+                    # could post the batch twice, so accept the risk of losing it
+                    self.uncertain += 1
+                    print(f"[WebhookSink] Webhook post to #{channel} may not have been delivered: {e!r}")
+                    return True
+        return False
+
+    @staticmethod
+    async def _retry_after(resp):
+        """Seconds to wait after a 429, from the JSON body or else the Retry-After header."""
+        try:
+            return float((await resp.json(content_type=None))['retry_after'])
+        except (ValueError, KeyError, TypeError, aiohttp.ClientError):
+            pass
+        try:
+            return float(resp.headers.get('Retry-After', 1))
+        except ValueError:
+            return 1.0
+
+    def stats(self):
+        return {'webhooks': len(self.urls), 'sent': self.sent, 'rate_limited': self.rate_limited, 'uncertain': self.uncertain}
@@ -0,0 +1,126 @@
+import asyncio
+import collections
+
+
+class WorkQueue:
+    """Bounded queue drained by a single worker task.
+
+    overflow decides what happens when the queue is full:
+      - 'drop_oldest': discard the oldest pending item to make room
+      - 'coalesce':    items sharing a key replace each other while pending,
+                       otherwise behaves like 'drop_oldest'
+      - 'block':       wait for the worker to make room (backpressure)
+    """
+
+    OVERFLOW_POLICIES = ('drop_oldest', 'coalesce', 'block')
+
+    def __init__(self, name, handler, maxsize=1000, overflow='drop_oldest', key=None):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if overflow == 'coalesce' and key is None:
+            raise ValueError("The 'coalesce' policy needs a key function")
+
+        self.name = name
+        self.handler = handler
+        self.maxsize = max(1, int(maxsize))
+        self.overflow = overflow
+        self.key = key
+
+        self._items = collections.deque()
+        self._pending = {}  # key -> latest item, only used when coalescing
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._worker = None
+
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.high_watermark = 0
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name=f"work-queue:{self.name}")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'maxsize': self.maxsize,
+            'overflow': self.overflow,
+            'high_watermark': self.high_watermark,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+        }
+
+    async def put(self, item):
+        """Queue an item for the worker. Only awaits under the 'block' policy."""
+        if self.overflow == 'coalesce':
+            k = self.key(item)
+            if k in self._pending:
+                self._pending[k] = item
+                self.coalesced += 1
+                return
+            if len(self._items) >= self.maxsize:
+                self._drop_oldest()
+            self._pending[k] = item
+            self._append(k)
+            return
+
+        if len(self._items) >= self.maxsize:
+            if self.overflow == 'block':
+                while len(self._items) >= self.maxsize:
+                    self._not_full.clear()
+                    await self._not_full.wait()
+            else:
+                self._drop_oldest()
+        self._append(item)
+
+    def _append(self, entry):
+        self._items.append(entry)
+        self.high_watermark = max(self.high_watermark, len(self._items))
+        self._not_empty.set()
+
+    def _drop_oldest(self):
+        entry = self._items.popleft()
+        if self.overflow == 'coalesce':
+            self._pending.pop(entry, None)
+        self.dropped += 1
+
+    def _pop(self):
+        entry = self._items.popleft()
+        if not self._items:
+            self._not_empty.clear()
+        self._not_full.set()
+        if self.overflow == 'coalesce':
+            return self._pending.pop(entry)
+        return entry
+
+    async def _run(self):
+        while True:
+            await self._not_empty.wait()
+            if not self._items:
+                self._not_empty.clear()
+                continue
+            item = self._pop()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"[WorkQueue:{self.name}] Error processing item: {e}")
+            else:
+                self.processed += 1